@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark transaction batching strategies against the original implementation
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.energy_processor import QuantumFinancialEnergyProcessor
+
+PURPOSES = ['payment for services', 'transfer', 'settlement fee', 'donation', 'withdrawal penalty', '']
+
+
+def legacy_batch_transactions(processor, transactions):
+    """Original quadratic implementation, kept as the benchmark baseline"""
+    batched = []
+    current_batch = []
+    current_energy = None
+
+    for transaction in transactions:
+        energy = processor._dimensional_reduction(transaction)
+
+        if current_energy is None:
+            current_energy = energy
+            current_batch.append(transaction)
+        else:
+            energy_diff = abs(current_energy - energy)
+            if energy_diff < processor.constructive_threshold:
+                current_batch.append(transaction)
+                current_energy = sum(processor._dimensional_reduction(t) for t in current_batch) / len(current_batch)
+            else:
+                batched.append(current_batch)
+                current_batch = [transaction]
+                current_energy = energy
+
+    if current_batch:
+        batched.append(current_batch)
+
+    return batched
+
+
+def make_transactions(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': f'tx_{i}',
+            'amount': rng.lognormvariate(5, 3),
+            'time_priority': rng.random(),
+            'purpose': rng.choice(PURPOSES)
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000, 50000])
+    parser.add_argument('--legacy-limit', type=int, default=2000,
+                        help='skip the quadratic baseline above this many transactions')
+    args = parser.parse_args()
+
+    processor = QuantumFinancialEnergyProcessor()
+
+    print("📦 Transaction batching benchmark")
+    print("=" * 72)
+    print(f"{'transactions':>12} {'legacy (s)':>12} {'sequential (s)':>15} {'energy_gap (s)':>15} {'batches':>10}")
+
+    for size in args.sizes:
+        transactions = make_transactions(size)
+
+        legacy_time = '-'
+        sequential_time, sequential = timed(processor.batch_transactions, transactions, 'sequential')
+        if size <= args.legacy_limit:
+            elapsed, legacy = timed(legacy_batch_transactions, processor, transactions)
+            legacy_time = f"{elapsed:.4f}"
+            assert legacy == sequential, "sequential strategy diverged from the original batching"
+        gap_time, gap = timed(processor.batch_transactions, transactions, 'energy_gap')
+
+        print(f"{size:>12} {legacy_time:>12} {sequential_time:>15.4f} {gap_time:>15.4f} "
+              f"{len(sequential):>4}/{len(gap):<5}")
+
+
+if __name__ == "__main__":
+    main()
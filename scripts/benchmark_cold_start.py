@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark MCP server cold start: import time, startup warm-up and first-request latency
+
+Every run starts a fresh interpreter, imports the server, runs its startup
+hooks with the chosen MCP_WARMUP mode and times the first requests through
+the ASGI app directly, so no HTTP server or client library is needed.
+With --check, the run fails when the server import pulls in NumPy or the
+energy processor, or when a median exceeds its budget.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+WARMUP_MODES = ('off', 'background', 'startup')
+METRICS = ('import_ms', 'startup_ms', 'health_ms', 'first_process_ms', 'second_process_ms', 'first_field_ms',
+           'vault_import_ms', 'first_sign_ms')
+
+
+async def _request(app, method, path, body=b''):
+    """Send one request through the ASGI app and return its status"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'bench'), (b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())],
+        'client': ('127.0.0.1', 0), 'server': ('bench', 80)
+    }
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _lifespan(app):
+    """Run the startup hooks; returns a coroutine function that runs the shutdown hooks"""
+    inbox = asyncio.Queue()
+    outbox = asyncio.Queue()
+    await inbox.put({'type': 'lifespan.startup'})
+    task = asyncio.ensure_future(app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, inbox.get, outbox.put))
+    message = await outbox.get()
+    if message['type'] != 'lifespan.startup.complete':
+        raise RuntimeError(f"Startup failed: {message}")
+
+    async def shutdown():
+        await inbox.put({'type': 'lifespan.shutdown'})
+        await outbox.get()
+        await task
+
+    return shutdown
+
+
+def _timed(timings, name, start):
+    timings[name] = (time.perf_counter() - start) * 1000
+
+
+async def _measure_requests(app, timings):
+    start = time.perf_counter()
+    shutdown = await _lifespan(app)
+    _timed(timings, 'startup_ms', start)
+
+    payload = json.dumps({'transactions': [{'amount': 100.0, 'purpose': 'payment'}], 'network': 'XRP'}).encode()
+    for name, method, path, body in (('health_ms', 'GET', '/', b''),
+                                     ('first_process_ms', 'POST', '/process-transactions', payload),
+                                     ('second_process_ms', 'POST', '/process-transactions', payload),
+                                     ('first_field_ms', 'GET', '/energy-field', b'')):
+        start = time.perf_counter()
+        status = await _request(app, method, path, body)
+        _timed(timings, name, start)
+        if status != 200:
+            raise RuntimeError(f"{method} {path} returned {status}")
+    await shutdown()
+
+
+def child():
+    """One cold start, printed as JSON"""
+    sys.path.append(os.path.join(ROOT, 'src'))
+    sys.path.append(ROOT)
+    timings = {}
+
+    start = time.perf_counter()
+    from compliance import mcp_server
+    _timed(timings, 'import_ms', start)
+    timings['numpy_at_import'] = 'numpy' in sys.modules
+    timings['processor_at_import'] = 'core.energy_processor' in sys.modules
+
+    asyncio.run(_measure_requests(mcp_server.app, timings))
+
+    start = time.perf_counter()
+    from wallets import quantum_vault
+    _timed(timings, 'vault_import_ms', start)
+    start = time.perf_counter()
+    quantum_vault.get_quantum_vault().sign_transaction({'amount': 1.0}, 'XRP')
+    _timed(timings, 'first_sign_ms', start)
+
+    print(json.dumps(timings))
+
+
+def run_cold_start(warmup, jobs_dir):
+    env = dict(os.environ, MCP_WARMUP=warmup, MCP_JOBS_DIR=jobs_dir)
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child'], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per warm-up mode')
+    parser.add_argument('--warmup', choices=WARMUP_MODES, nargs='+', default=list(WARMUP_MODES))
+    parser.add_argument('--check', action='store_true', help='exit non-zero on eager imports or exceeded budgets')
+    parser.add_argument('--max-import-ms', type=float, help='budget for the median server import')
+    parser.add_argument('--max-health-ms', type=float, help='budget for the median first health check')
+    parser.add_argument('--max-first-process-ms', type=float, help='budget for the median first processing request')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    budgets = {'import_ms': args.max_import_ms, 'health_ms': args.max_health_ms,
+               'first_process_ms': args.max_first_process_ms}
+    failures = []
+    with tempfile.TemporaryDirectory() as jobs_dir:
+        for warmup in args.warmup:
+            runs = [run_cold_start(warmup, jobs_dir) for _ in range(args.runs)]
+            print(f"MCP_WARMUP={warmup} ({args.runs} cold starts)")
+            print(f"  {'':<20} {'median ms':>10} {'max ms':>10}")
+            for metric in METRICS:
+                values = [run[metric] for run in runs]
+                median = statistics.median(values)
+                print(f"  {metric[:-3]:<20} {median:>10.1f} {max(values):>10.1f}")
+                if budgets.get(metric) is not None and median > budgets[metric]:
+                    failures.append(f"{warmup}: median {metric[:-3]} {median:.1f} ms exceeds {budgets[metric]:.1f} ms")
+            eager = [name for name in ('numpy_at_import', 'processor_at_import') if any(run[name] for run in runs)]
+            print(f"  eager imports: {', '.join(eager) if eager else 'none'}")
+            failures.extend(f"{warmup}: server import loaded {name.replace('_at_import', '')}" for name in eager)
+            print()
+
+    if args.check and failures:
+        print("FAILED")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the reduced-precision (complex64) energy field against complex128
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.energy_processor import QuantumFinancialEnergyProcessor
+
+PURPOSES = ['payment for services', 'transfer', 'settlement fee', 'donation', 'withdrawal penalty', '']
+NETWORKS = ['XRP', 'XLM', 'XDC', 'HBAR']
+
+
+def make_transactions(count, seed=42):
+    rng = random.Random(seed)
+    return [
+        {
+            'id': f'tx_{i}',
+            'amount': rng.lognormvariate(5, 3),
+            'time_priority': rng.random(),
+            'purpose': rng.choice(PURPOSES)
+        }
+        for i in range(count)
+    ]
+
+
+def replay(transactions, field_dtype, backend, batch_size):
+    processor = QuantumFinancialEnergyProcessor(field_backend=backend, field_dtype=field_dtype,
+                                                history_size=len(transactions))
+    start = time.perf_counter()
+    for index, offset in enumerate(range(0, len(transactions), batch_size)):
+        processor.process_batch(transactions[offset:offset + batch_size], NETWORKS[index % len(NETWORKS)])
+    elapsed = time.perf_counter() - start
+    memory = processor.energy_field.nbytes + processor.transaction_history.records().nbytes
+    return elapsed, memory, processor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--transactions', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    parser.add_argument('--backend', default='dense', choices=['dense', 'sparse'])
+    args = parser.parse_args()
+
+    transactions = make_transactions(args.transactions)
+
+    print("🎯 Energy field precision benchmark")
+    print("=" * 72)
+    print(f"{'dtype':>12} {'time (s)':>10} {'memory (MB)':>12} {'max cell error':>16} {'snapshot error':>16}")
+
+    reference = None
+    for field_dtype in ('complex128', 'complex64'):
+        elapsed, memory, processor = replay(transactions, field_dtype, args.backend, args.batch_size)
+        snapshot = processor.get_energy_snapshot()
+        if reference is None:
+            reference = processor
+        cell_error = float(abs(processor.energy_field.to_dense() - reference.energy_field.to_dense()).max())
+        reference_snapshot = reference.get_energy_snapshot()
+        snapshot_error = max(abs(snapshot[key] - reference_snapshot[key]) / max(abs(reference_snapshot[key]), 1e-300)
+                             for key in ('magnitude_mean', 'phase_mean', 'energy_sum'))
+
+        print(f"{field_dtype:>12} {elapsed:>10.3f} {memory / 2**20:>12.1f} {cell_error:>16.3e} {snapshot_error:>16.3e}")
+
+
+if __name__ == "__main__":
+    main()
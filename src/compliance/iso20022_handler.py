@@ -1,5 +1,12 @@
-from typing import Dict, List, Any
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Union
 from datetime import datetime
+import math
+import xml.etree.ElementTree as ET
+
+from .iso20022_xml import ISO20022XMLWriter
+
+# Inbound message types whose CdtTrfTxInf entries are customer credit transfers
+INBOUND_MESSAGE_TYPES = ('pacs.008', 'pain.001')
 
 class ISO20022Mapper:
     """Handle ISO 20022 compliance mapping"""
@@ -29,13 +36,224 @@ class ISO20022Mapper:
             'remittance_information': transaction.get('purpose', '')
         }
     
+    def xml_writer(self, write: Callable[[bytes], Any], message_size: int = 1000) -> ISO20022XMLWriter:
+        """Streaming writer of grouped pacs.008/pacs.002 XML for bulk output"""
+        return ISO20022XMLWriter(write, message_size, self.message_types)
+    
+    def parse_transactions(self, source: Union[str, BinaryIO], chunk_size: int = 1 << 16) -> Iterator[Dict]:
+        """Yield transactions from a pacs.008 or pain.001 file, reading it in chunks"""
+        parser = ISO20022Parser()
+        stream = open(source, 'rb') if isinstance(source, str) else source
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                yield from parser.feed(chunk)
+            yield from parser.close()
+        finally:
+            if stream is not source:
+                stream.close()
+    
     def generate_compliance_report(self, processed_transactions: List[Dict]) -> Dict:
         """Generate compliance report for processed transactions"""
+        return self.generate_compliance_summary(len(processed_transactions))
+    
+    def generate_compliance_summary(self, total_transactions: int) -> Dict:
+        """Generate compliance report from a transaction count, for results that were not kept"""
         return {
-            'total_transactions': len(processed_transactions),
+            'total_transactions': total_transactions,
             'compliance_status': 'COMPLIANT',
-            'iso20022_messages_generated': len(processed_transactions),
+            'iso20022_messages_generated': total_transactions,
             'report_timestamp': datetime.now().isoformat(),
             'risk_score': 'LOW',
             'aml_flags': []
         }
+
+
+# Elements handled at their end tag; the rest are only tracked for nesting
+_HANDLED_ELEMENTS = frozenset(('CdtTrfTxInf', 'GrpHdr', 'Dbtr', 'Document'))
+# Message types of the message root elements, for Documents without a namespace
+_MESSAGE_ROOTS = {'FIToFICstmrCdtTrf': 'pacs.008', 'CstmrCdtTrfInitn': 'pain.001'}
+# Identifiers of an entry in order of preference
+_ID_ELEMENTS = ('TxId', 'EndToEndId', 'InstrId', 'UETR')
+
+class ISO20022Parser:
+    """Incremental parser of inbound pacs.008 and pain.001 XML
+    
+    The document is fed in chunks of any size; each call returns the
+    transactions whose CdtTrfTxInf element closed within it, mapped to the
+    dict shape the energy processor takes, with the message details under
+    'iso20022'. Entries, group headers and every other block under the
+    message root are removed from the tree as soon as they are read, so
+    memory does not grow with the file. Several Documents, such as the <Messages>
+    envelope of ISO20022XMLWriter, may follow each other.
+    
+    The message type comes from the Document namespace or, without one,
+    from the message root element. Documents of other message types are
+    reported in errors and their entries counted as skipped, as are
+    entries without a usable (finite, non-negative) amount; a document whose NbOfTxs differs
+    from its entries is reported in errors too.
+    """
+    
+    MAX_ERRORS = 100
+    
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._stack: List[ET.Element] = []
+        # Local names by namespaced tag; a document uses few distinct tags
+        self._names: Dict[str, str] = {}
+        self._message_type = ''
+        self._document_depth = 0
+        self._group: Dict[str, Any] = {}
+        self._debtor: Optional[str] = None
+        self._document_count = 0
+        self.transactions = 0
+        self.skipped = 0
+        self.errors: List[str] = []
+    
+    def feed(self, data: bytes) -> List[Dict]:
+        """Parse the next chunk and return the transactions completed in it
+        
+        Raises xml.etree.ElementTree.ParseError for malformed XML.
+        """
+        self._parser.feed(data)
+        return self._read_events()
+    
+    def close(self) -> List[Dict]:
+        """Finish the document, raising ParseError if it is incomplete"""
+        self._parser.close()
+        return self._read_events()
+    
+    def _error(self, message: str):
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(message)
+    
+    def _name(self, tag: str) -> str:
+        name = self._names.get(tag)
+        if name is None:
+            name = self._names[tag] = tag.rpartition('}')[2]
+        return name
+    
+    def _children(self, element: ET.Element) -> Dict[str, ET.Element]:
+        return {self._name(child.tag): child for child in element}
+    
+    def _child_text(self, element: Optional[ET.Element], name: str) -> Optional[str]:
+        if element is not None:
+            for child in element:
+                if self._name(child.tag) == name:
+                    return child.text
+        return None
+    
+    def _read_events(self) -> List[Dict]:
+        transactions = []
+        stack = self._stack
+        for event, element in self._parser.read_events():
+            name = self._name(element.tag)
+            if event == 'start':
+                stack.append(element)
+                if name == 'Document':
+                    namespace = element.tag[1:].partition('}')[0] if element.tag.startswith('{') else ''
+                    self._message_type = namespace.rpartition(':')[2]
+                    self._document_depth = len(stack)
+                    self._group = {}
+                    self._document_count = 0
+                elif len(stack) == self._document_depth + 1 and not self._message_type:
+                    self._message_type = _MESSAGE_ROOTS.get(name, '')
+                elif name == 'PmtInf':
+                    self._debtor = None
+                continue
+            
+            stack.pop()
+            if name not in _HANDLED_ELEMENTS and len(stack) != self._document_depth + 1:
+                continue
+            parent = stack[-1] if stack else None
+            if name == 'CdtTrfTxInf':
+                if self._message_type.startswith(INBOUND_MESSAGE_TYPES):
+                    transaction = self._transaction(element)
+                    if transaction is not None:
+                        transactions.append(transaction)
+                else:
+                    self._document_count += 1
+                    self.skipped += 1
+                if parent is not None:
+                    parent.remove(element)
+            elif name == 'GrpHdr':
+                self._group = {
+                    'message_id': self._child_text(element, 'MsgId') or '',
+                    'creation_date_time': self._child_text(element, 'CreDtTm') or '',
+                    'number_of_transactions': self._child_text(element, 'NbOfTxs')
+                }
+                parent.remove(element)
+            elif name == 'Dbtr':
+                if parent is not None and self._name(parent.tag) == 'PmtInf':
+                    # pain.001 names the debtor once for all entries of a payment information block
+                    self._debtor = self._child_text(element, 'Nm')
+            elif len(stack) == self._document_depth + 1:
+                # Blocks directly under the message root, such as PmtInf or the entries of other message types
+                parent.remove(element)
+            elif name == 'Document':
+                message_id = self._group.get('message_id') or '(no MsgId)'
+                declared = self._group.get('number_of_transactions')
+                if not self._message_type.startswith(INBOUND_MESSAGE_TYPES):
+                    self._error(f"Message {message_id} skipped: {self._message_type or 'unknown message type'} "
+                                "is not pacs.008 or pain.001")
+                elif declared is not None and declared.strip() != str(self._document_count):
+                    self._error(f"Message {message_id} declares {declared.strip()} "
+                                f"transactions but has {self._document_count}")
+                if parent is not None:
+                    parent.remove(element)
+                else:
+                    element.clear()
+        return transactions
+    
+    def _transaction(self, entry: ET.Element) -> Optional[Dict]:
+        self._document_count += 1
+        fields = self._children(entry)
+        amount = fields.get('IntrBkSttlmAmt')
+        if amount is None and 'Amt' in fields:
+            amount = self._children(fields['Amt']).get('InstdAmt')
+        try:
+            value = float(amount.text)
+            # ISO 20022 amounts are finite and never negative
+            if not math.isfinite(value) or value < 0:
+                raise ValueError(amount.text)
+        except (AttributeError, TypeError, ValueError):
+            self.skipped += 1
+            self._error(f"Transaction {self._document_count} of message {self._group.get('message_id')} "
+                        "has no valid amount")
+            return None
+        currency = amount.get('Ccy', 'USD')
+        
+        transaction: Dict[str, Any] = {'amount': value, 'currency': currency}
+        if 'PmtId' in fields:
+            identifiers = self._children(fields['PmtId'])
+            for field in _ID_ELEMENTS:
+                identifier = identifiers[field].text if field in identifiers else None
+                if identifier and identifier != 'NOTPROVIDED':
+                    transaction['id'] = identifier
+                    break
+        debtor = self._child_text(fields.get('Dbtr'), 'Nm') or self._debtor
+        creditor = self._child_text(fields.get('Cdtr'), 'Nm')
+        purpose = self._child_text(fields.get('RmtInf'), 'Ustrd') or self._child_text(fields.get('Purp'), 'Cd')
+        if debtor:
+            transaction['from'] = debtor
+        if creditor:
+            transaction['to'] = creditor
+        if purpose:
+            transaction['purpose'] = purpose
+        if self._group.get('creation_date_time'):
+            transaction['timestamp'] = self._group['creation_date_time']
+        
+        # Keeps the original message details, so they are not regenerated by to_iso20022
+        transaction['iso20022'] = {
+            'message_type': self._message_type,
+            'message_id': self._group.get('message_id', ''),
+            'creation_date_time': self._group.get('creation_date_time', ''),
+            'instructing_agent': debtor or '',
+            'instructed_agent': creditor or '',
+            'instructed_amount': {'currency': currency, 'amount': amount.text.strip()},
+            'remittance_information': purpose or ''
+        }
+        self.transactions += 1
+        return transaction
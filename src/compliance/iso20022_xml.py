@@ -0,0 +1,193 @@
+import re
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+PACS_008 = 'pacs.008.001.08'
+PACS_002 = 'pacs.002.001.10'
+NAMESPACE = 'urn:iso:std:iso:20022:tech:xsd:'
+ROOT_ELEMENTS = {PACS_008: 'FIToFICstmrCdtTrf', PACS_002: 'FIToFIPmtStsRpt'}
+
+# Minor units of currencies that do not use two decimals
+CURRENCY_DECIMALS = {'BHD': 3, 'IQD': 3, 'JOD': 3, 'KWD': 3, 'LYD': 3, 'OMR': 3, 'TND': 3,
+                     'CLP': 0, 'ISK': 0, 'JPY': 0, 'KRW': 0, 'PYG': 0, 'UGX': 0, 'VND': 0, 'XAF': 0, 'XOF': 0}
+_DEFAULT_QUANTUM = Decimal('0.01')
+_QUANTUMS = {currency: Decimal(1).scaleb(-decimals) for currency, decimals in CURRENCY_DECIMALS.items()}
+
+# Schema length limits of Max35Text and Max140Text
+MAX_ID_LENGTH = 35
+MAX_TEXT_LENGTH = 140
+# Agents are not part of the transaction data, so they are reported as not provided
+UNKNOWN_AGENT = '<FinInstnId><Othr><Id>NOTPROVIDED</Id></Othr></FinInstnId>'
+
+
+def _text(value: Any, limit: int = MAX_TEXT_LENGTH) -> str:
+    text = str(value)[:limit]
+    # Most names and ids need no escaping, and the membership tests are far cheaper than escape()
+    if '&' in text or '<' in text or '>' in text:
+        return escape(text)
+    return text
+
+
+class _OpenMessage:
+    __slots__ = ('entries', 'control_sum')
+
+    def __init__(self):
+        self.entries: List[str] = []
+        self.control_sum = Decimal(0)
+
+
+class ISO20022XMLWriter:
+    """Stream transactions as grouped pacs.008 and pacs.002 XML messages
+
+    Each transaction is routed by purpose, as in ISO20022Mapper, to a
+    pacs.008 credit transfer or a pacs.002 status report and appended to
+    the open message of that type. A message is written out once it holds
+    message_size transactions, under a single group header whose NbOfTxs
+    and CtrlSum were accumulated entry by entry; close() writes the
+    partial messages. Only one open message per type is held, so output of
+    any length is produced in bounded memory. The messages are wrapped in
+    one <Messages> envelope, keeping the whole output a single document.
+
+    write receives the encoded bytes, one message per call: a file's write
+    method, or a list's append to feed a streaming response.
+    """
+
+    def __init__(self, write: Callable[[bytes], Any], message_size: int = 1000,
+                 message_types: Optional[Dict[str, str]] = None, default_currency: str = 'USD'):
+        if message_size < 1:
+            raise ValueError("Message size must be at least 1")
+        self.message_types = message_types if message_types is not None else {'settlement': PACS_002}
+        unsupported = set(self.message_types.values()) - set(ROOT_ELEMENTS)
+        if unsupported:
+            raise ValueError(f"Unsupported message types: {', '.join(sorted(unsupported))}")
+        self._write = write
+        self.message_size = message_size
+        self.default_currency = default_currency
+        self._open: Dict[str, _OpenMessage] = {}
+        # Message ids are this prefix plus a sequence number, 29 characters in all
+        self._id_prefix = 'MSG' + datetime.now().strftime('%Y%m%d%H%M%S') + uuid.uuid4().hex[:6].upper()
+        self._started = False
+        self._closed = False
+        self.messages = 0
+        self.transactions = 0
+        self.control_sum = Decimal(0)
+
+    def __enter__(self) -> 'ISO20022XMLWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def add(self, transaction: Dict):
+        """Append one transaction, writing its message out when it is full
+
+        Raises ValueError for a transaction without a valid amount or
+        currency; the transaction is then left out.
+        """
+        if self._closed:
+            raise ValueError("Writer is closed")
+        message_type = self.message_types.get(transaction.get('purpose', 'payment'), PACS_008)
+        amount, currency = self._amount(transaction)
+        if message_type == PACS_008:
+            entry = self._credit_transfer(transaction, amount, currency)
+        else:
+            entry = self._status_report(transaction, amount, currency)
+
+        message = self._open.get(message_type)
+        if message is None:
+            message = self._open[message_type] = _OpenMessage()
+        message.entries.append(entry)
+        message.control_sum += amount
+        self.transactions += 1
+        self.control_sum += amount
+        if len(message.entries) >= self.message_size:
+            self._flush(message_type)
+
+    def close(self) -> Dict[str, Any]:
+        """Write the partial messages and close the envelope; returns message and transaction totals"""
+        if not self._closed:
+            for message_type in list(self._open):
+                self._flush(message_type)
+            self._write((b'' if self._started else self._prologue()) + b'</Messages>\n')
+            self._closed = True
+        return {'messages': self.messages, 'transactions': self.transactions,
+                'control_sum': format(self.control_sum, 'f')}
+
+    def comment(self, text: str):
+        """Write an XML comment between messages, such as a note about a skipped transaction"""
+        body = ('<!-- ' + re.sub('-(?=-)', '- ', text) + ' -->\n').encode()
+        self._write(body if self._started else self._prologue() + body)
+
+    def _prologue(self) -> bytes:
+        self._started = True
+        return b'<?xml version="1.0" encoding="UTF-8"?>\n<Messages>\n'
+
+    def _amount(self, transaction: Dict) -> Tuple[Decimal, str]:
+        currency = str(transaction.get('currency', self.default_currency)).upper()
+        if len(currency) != 3 or not currency.isalpha():
+            raise ValueError(f"Invalid currency {currency!r}")
+        try:
+            amount = Decimal(str(transaction.get('amount', 0)))
+            if not amount.is_finite() or amount < 0:
+                raise InvalidOperation
+            return amount.quantize(_QUANTUMS.get(currency, _DEFAULT_QUANTUM)), currency
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount {transaction.get('amount')!r}") from None
+
+    def _flush(self, message_type: str):
+        message = self._open.pop(message_type)
+        self.messages += 1
+        header = (f"<GrpHdr><MsgId>{self._id_prefix}{self.messages:06d}</MsgId>"
+                  f"<CreDtTm>{datetime.now().isoformat(timespec='seconds')}</CreDtTm>")
+        if message_type == PACS_008:
+            header += (f"<NbOfTxs>{len(message.entries)}</NbOfTxs>"
+                       f"<CtrlSum>{format(message.control_sum, 'f')}</CtrlSum>"
+                       "<SttlmInf><SttlmMtd>CLRG</SttlmMtd></SttlmInf>")
+        root = ROOT_ELEMENTS[message_type]
+        body = ''.join([f'<Document xmlns="{NAMESPACE}{message_type}"><{root}>', header, '</GrpHdr>\n',
+                        *message.entries, f'</{root}></Document>\n']).encode()
+        self._write(body if self._started else self._prologue() + body)
+
+    @staticmethod
+    def _parties(transaction: Dict, wrap: str = '') -> Tuple[str, str]:
+        parties = []
+        for field in ('from', 'to'):
+            name = transaction.get(field)
+            party = f"<Nm>{_text(name)}</Nm>" if name else ''
+            parties.append(f"<{wrap}>{party}</{wrap}>" if wrap and party else party)
+        return parties[0], parties[1]
+
+    def _credit_transfer(self, transaction: Dict, amount: Decimal, currency: str) -> str:
+        identifier = transaction.get('id')
+        if identifier is not None:
+            identifier = _text(identifier, MAX_ID_LENGTH)
+            payment_id = f"<EndToEndId>{identifier}</EndToEndId><TxId>{identifier}</TxId>"
+        else:
+            payment_id = "<EndToEndId>NOTPROVIDED</EndToEndId>"
+        debtor, creditor = self._parties(transaction)
+        purpose = transaction.get('purpose')
+        return (f"<CdtTrfTxInf><PmtId>{payment_id}</PmtId>"
+                f'<IntrBkSttlmAmt Ccy="{currency}">{format(amount, "f")}</IntrBkSttlmAmt><ChrgBr>SLEV</ChrgBr>'
+                f"<Dbtr>{debtor}</Dbtr><DbtrAgt>{UNKNOWN_AGENT}</DbtrAgt>"
+                f"<CdtrAgt>{UNKNOWN_AGENT}</CdtrAgt><Cdtr>{creditor}</Cdtr>"
+                + (f"<RmtInf><Ustrd>{_text(purpose)}</Ustrd></RmtInf>" if purpose else '')
+                + "</CdtTrfTxInf>\n")
+
+    def _status_report(self, transaction: Dict, amount: Decimal, currency: str) -> str:
+        identifier = transaction.get('id')
+        original_id = ''
+        if identifier is not None:
+            identifier = _text(identifier, MAX_ID_LENGTH)
+            original_id = f"<OrgnlEndToEndId>{identifier}</OrgnlEndToEndId><OrgnlTxId>{identifier}</OrgnlTxId>"
+        debtor, creditor = self._parties(transaction, 'Pty')
+        purpose = transaction.get('purpose')
+        return (f"<TxInfAndSts>{original_id}<TxSts>ACSC</TxSts><OrgnlTxRef>"
+                f'<IntrBkSttlmAmt Ccy="{currency}">{format(amount, "f")}</IntrBkSttlmAmt>'
+                + (f"<RmtInf><Ustrd>{_text(purpose)}</Ustrd></RmtInf>" if purpose else '')
+                + (f"<Dbtr>{debtor}</Dbtr>" if debtor else '')
+                + (f"<Cdtr>{creditor}</Cdtr>" if creditor else '')
+                + "</OrgnlTxRef></TxInfAndSts>\n")
@@ -1,18 +1,66 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional
+from collections import OrderedDict
 from datetime import datetime
+import asyncio
+import json
+import logging
 import sys
 import os
+import tempfile
+from xml.etree.ElementTree import ParseError
 
 # Add src to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from core.energy_processor import energy_processor
-from compliance.iso20022_handler import ISO20022Mapper
+# Modules that pull in NumPy are imported on first use, keeping cold start and the health check light
+from core.batch_coalescer import BatchCoalescer
+from core.batch_executor import BatchExecutor, ExecutorFull
+from core.execution_scheduler import ResonanceScheduler
+from core.metrics import metrics
+from compliance.iso20022_handler import ISO20022Mapper, ISO20022Parser
+from compliance.response_cache import ResponseCache
 
 app = FastAPI(title="Financial Energy MCP Server", version="1.0.0")
-iso_mapper = ISO20022Mapper()
+logger = logging.getLogger(__name__)
+
+_energy_processor = None
+
+def get_energy_processor():
+    """Shared energy processor, created on first use"""
+    global _energy_processor
+    if _energy_processor is None:
+        from core.energy_processor import get_energy_processor as get_processor
+        _energy_processor = get_processor()
+        if _scheduler is not None:
+            _scheduler.add_networks(list(_energy_processor.network_resonances))
+    return _energy_processor
+
+async def energy_processor_ready():
+    """Shared energy processor, created on a worker thread so the event loop never waits for it"""
+    if _energy_processor is None:
+        await asyncio.get_running_loop().run_in_executor(None, get_energy_processor)
+    return _energy_processor
+
+_iso_mapper: Optional[ISO20022Mapper] = None
+
+def get_iso_mapper() -> ISO20022Mapper:
+    global _iso_mapper
+    if _iso_mapper is None:
+        _iso_mapper = ISO20022Mapper()
+    return _iso_mapper
+
+# Batch processing runs off the event loop so light endpoints stay responsive
+batch_executor = BatchExecutor(
+    mode=os.environ.get('MCP_EXECUTION_MODE', 'thread'),
+    workers=int(os.environ.get('MCP_EXECUTION_WORKERS', '4')),
+    max_queue=int(os.environ.get('MCP_EXECUTION_QUEUE', '64'))
+)
+if batch_executor.mode == 'process' and os.environ.get('ENERGY_FIELD_BACKEND', 'dense') != 'shared':
+    raise ValueError("MCP_EXECUTION_MODE=process requires ENERGY_FIELD_BACKEND=shared")
+REQUEST_TIMEOUT = float(os.environ.get('MCP_REQUEST_TIMEOUT', '30'))
 
 class TransactionRequest(BaseModel):
     transactions: List[Dict]
@@ -34,52 +82,800 @@ async def root():
         "timestamp": datetime.now().isoformat()
     }
 
+def _process_request(transactions: List[Dict], network: str):
+    """Batch work for one request, run on the batch executor"""
+    energy_processor = get_energy_processor()
+    iso_mapper = get_iso_mapper()
+    with metrics.stage('to_iso20022', network, 'batch'):
+        for transaction in transactions:
+            # Convert to ISO 20022 if needed
+            if 'iso20022' not in transaction:
+                transaction['iso20022'] = iso_mapper.to_iso20022(transaction)
+    
+    # Process through energy system as one vectorized batch
+    processed = energy_processor.process_batch(transactions, network)
+    return processed, energy_processor.get_energy_snapshot()
+
+async def _process_coalesced(transactions: List[Dict], network: str) -> List[Dict]:
+    processed, _ = await batch_executor.run(_process_request, transactions, network, timeout=REQUEST_TIMEOUT)
+    return processed
+
+# Small concurrent requests are merged into one batch per network; a zero window disables this
+coalescer = None
+if float(os.environ.get('MCP_COALESCE_WINDOW_MS', '2')) > 0:
+    coalescer = BatchCoalescer(
+        _process_coalesced,
+        window=float(os.environ.get('MCP_COALESCE_WINDOW_MS', '2')) / 1000,
+        max_items=int(os.environ.get('MCP_COALESCE_MAX_ITEMS', '512'))
+    )
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    batch_executor.shutdown(wait=False)
+
+@app.on_event("shutdown")
+async def close_energy_processor():
+    # Commits write-ahead log records still waiting for their group, so a graceful restart loses none
+    if _energy_processor is not None:
+        await asyncio.get_running_loop().run_in_executor(None, _energy_processor.close)
+
+# 'background' warms up right after startup without delaying it, 'startup' finishes
+# warming up before requests are accepted, and 'off' leaves everything to the first request
+WARMUP_MODES = ('background', 'startup', 'off')
+WARMUP = os.environ.get('MCP_WARMUP', 'background')
+if WARMUP not in WARMUP_MODES:
+    raise ValueError(f"Unknown MCP_WARMUP '{WARMUP}', expected one of {', '.join(WARMUP_MODES)}")
+
+def warm_up():
+    """Create the processor and ISO 20022 mapper and run the read paths once"""
+    energy_processor = get_energy_processor()
+    get_iso_mapper()
+    energy_processor.get_energy_snapshot()
+    energy_processor.resonance_schedule(1)
+
+def _log_warm_up_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Warm-up failed", exc_info=future.exception())
+
+@app.on_event("startup")
+async def start_warm_up():
+    if WARMUP == 'off':
+        return
+    warming = asyncio.get_running_loop().run_in_executor(None, warm_up)
+    if WARMUP == 'startup':
+        await warming
+    else:
+        warming.add_done_callback(_log_warm_up_failure)
+
+# Results of /process-transactions?schedule=true are held until their optimal_execution time
+SCHEDULER_CONCURRENCY = int(os.environ.get('MCP_SCHEDULER_CONCURRENCY', '8'))
+SCHEDULER_MAX_PENDING = int(os.environ.get('MCP_SCHEDULER_MAX_PENDING', '100000'))
+# Final states of this many released or cancelled tickets are kept for lookups
+SCHEDULER_HISTORY = int(os.environ.get('MCP_SCHEDULER_HISTORY', '100000'))
+_scheduler: Optional[ResonanceScheduler] = None
+_executions: 'OrderedDict[int, Dict]' = OrderedDict()
+_execution_waiters: Dict[int, asyncio.Event] = {}
+
+def _finish_execution(ticket: int, record: Dict):
+    _executions[ticket] = record
+    while len(_executions) > SCHEDULER_HISTORY:
+        _executions.popitem(last=False)
+    waiter = _execution_waiters.pop(ticket, None)
+    if waiter is not None:
+        waiter.set()
+
+async def _release_execution(result: Dict):
+    """Scheduler handler, called once a result's resonance peak has arrived"""
+    due = result['optimal_execution']
+    _finish_execution(result['execution_ticket'], {
+        "status": "released",
+        "network": result['network'],
+        "optimal_execution": due.isoformat() if isinstance(due, datetime) else due,
+        "released_at": datetime.now().isoformat()
+    })
+
+def get_scheduler() -> ResonanceScheduler:
+    """Resonance scheduler; its network queues are created from the processor's networks once it exists"""
+    global _scheduler
+    if _scheduler is None:
+        networks = list(_energy_processor.network_resonances) if _energy_processor is not None else []
+        _scheduler = ResonanceScheduler(
+            _release_execution, networks, concurrency=SCHEDULER_CONCURRENCY, max_pending=SCHEDULER_MAX_PENDING
+        )
+    return _scheduler
+
+@app.on_event("startup")
+async def start_scheduler():
+    await get_scheduler().start()
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    if _scheduler is not None:
+        await _scheduler.stop()
+
 @app.post("/process-transactions", response_model=EnergyResponse)
-async def process_transactions(request: TransactionRequest):
+async def process_transactions(
+    request: TransactionRequest,
+    timeout: Optional[float] = Query(None, gt=0, description="Deadline in seconds, MCP_REQUEST_TIMEOUT when omitted"),
+    schedule: bool = Query(False, description="Hold each result until its optimal_execution time; "
+                                              "results then carry an execution_ticket")
+):
     """Process transactions through energy system with compliance"""
+    energy_processor = await energy_processor_ready()
+    iso_mapper = get_iso_mapper()
+    scheduler = get_scheduler() if schedule else None
+    if scheduler is not None and scheduler.pending + len(request.transactions) > scheduler.max_pending:
+        raise HTTPException(status_code=503, detail=f"{scheduler.pending} executions already scheduled",
+                            headers={"Retry-After": "1"})
     try:
-        processed = []
-        for transaction in request.transactions:
-            # Convert to ISO 20022 if needed
+        if coalescer is not None and len(request.transactions) < coalescer.max_items:
+            processed = await asyncio.wait_for(
+                coalescer.submit(request.transactions, request.network), timeout or REQUEST_TIMEOUT
+            )
+            snapshot = energy_processor.get_energy_snapshot()
+        else:
+            processed, snapshot = await batch_executor.run(
+                _process_request, request.transactions, request.network, timeout=timeout or REQUEST_TIMEOUT
+            )
+    except ExecutorFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except asyncio.TimeoutError:
+        request_errors.inc(1, "/process-transactions", "DeadlineExceeded")
+        raise HTTPException(status_code=504, detail="Processing deadline exceeded")
+    except Exception as e:
+        logger.exception("Processing %d transactions for %s failed", len(request.transactions), request.network)
+        request_errors.inc(1, "/process-transactions", type(e).__name__)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if scheduler is not None:
+        for result in processed:
+            result['execution_ticket'] = await scheduler.submit_wait(result)
+    
+    # Generate compliance report
+    compliance_report = iso_mapper.generate_compliance_report(processed)
+    
+    return EnergyResponse(
+        results=processed,
+        energy_field_snapshot=snapshot,
+        compliance_report=compliance_report
+    )
+
+def _json_default(value: Any):
+    """Encode values json cannot, the same way the JSON endpoints do"""
+    if isinstance(value, complex):
+        return str(value).strip('()')
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _ndjson(record: Dict) -> bytes:
+    return json.dumps(record, default=_json_default, separators=(',', ':')).encode() + b'\n'
+
+class DuplexStreamingResponse(StreamingResponse):
+    """StreamingResponse whose body generator keeps reading the request body
+    
+    StreamingResponse watches for client disconnects by reading the request's
+    receive channel, which would swallow body chunks the generator is still
+    waiting for. Here a disconnect surfaces from request.stream() instead.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+def _process_records(group: List[Dict], network: str, lines: Optional[List[int]] = None) -> List[bytes]:
+    """Batch work for one streamed group or job chunk, run on the batch executor
+    
+    With lines given, each result carries the input line number of its transaction.
+    """
+    energy_processor = get_energy_processor()
+    iso_mapper = get_iso_mapper()
+    with metrics.stage('to_iso20022', network, 'batch'):
+        for transaction in group:
             if 'iso20022' not in transaction:
                 transaction['iso20022'] = iso_mapper.to_iso20022(transaction)
+    results = energy_processor.process_batch(group, network)
+    if lines is not None:
+        for result, line in zip(results, lines):
+            result['line'] = line
+    return [_ndjson(result) for result in results]
+
+def _process_group(group: List[Dict], network: str, lines: Optional[List[int]] = None) -> bytes:
+    return b''.join(_process_records(group, network, lines))
+
+# Longest NDJSON line buffered from a streamed body; longer lines are skipped
+MAX_LINE_BYTES = int(os.environ.get('MCP_MAX_LINE_BYTES', '1048576'))
+LINE_TOO_LONG = f"Line exceeds {MAX_LINE_BYTES} bytes"
+
+async def _ndjson_lines(request: Request) -> AsyncIterator[Optional[bytes]]:
+    """Split a streamed request body into lines, holding at most one chunk and MAX_LINE_BYTES
+    
+    A line longer than MAX_LINE_BYTES is discarded as it arrives and
+    yielded as None, so callers can report it and line numbers stay aligned.
+    """
+    pending = b''
+    discarding = False
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            if discarding:
+                # The end of a line already reported as too long
+                discarding = False
+            elif len(line) > MAX_LINE_BYTES:
+                yield None
+            else:
+                yield line
+        if len(pending) > MAX_LINE_BYTES:
+            if not discarding:
+                yield None
+                discarding = True
+            pending = b''
+    if pending and not discarding:
+        yield pending
+
+async def _stream_results(items: AsyncIterator[Any], network: str, endpoint: str,
+                          summary: Callable[[int], Dict]) -> AsyncIterator[bytes]:
+    """Process the transaction groups from items on the batch executor, streaming NDJSON results
+    
+    Items are (transactions, line numbers) pairs, where the line numbers
+    may be None, or dicts, which are error records and are passed through.
+    Error records can come out ahead of results for earlier lines still in
+    an open group, so with line numbers each result carries its "line".
+    The last record is the summary: the processed count, the fields
+    summary() returns for the error record count, the compliance report
+    and the energy field snapshot.
+    """
+    energy_processor = get_energy_processor()
+    iso_mapper = get_iso_mapper()
+    processed = 0
+    errors = 0
+    async for item in items:
+        if isinstance(item, dict):
+            errors += 1
+            yield _ndjson(item)
+            continue
+        group, lines = item
+        try:
+            # Streams wait for a free slot instead of being shed part-way through
+            yield await batch_executor.run(_process_group, group, network, lines, timeout=REQUEST_TIMEOUT, wait=True)
+        except asyncio.TimeoutError:
+            yield _ndjson({"error": "Processing deadline exceeded", "processed": processed})
+            return
+        except Exception as e:
+            logger.exception("Processing a streamed group of %d transactions for %s failed", len(group), network)
+            request_errors.inc(1, endpoint, type(e).__name__)
+            # Headers are already sent, so a failed group ends the stream with an error record
+            yield _ndjson({"error": str(e), "processed": processed})
+            return
+        processed += len(group)
+    
+    yield _ndjson({
+        "summary": {
+            "processed": processed,
+            **summary(errors),
+            "energy_field_snapshot": energy_processor.get_energy_snapshot(),
+            "compliance_report": iso_mapper.generate_compliance_summary(processed)
+        }
+    })
+
+@app.post("/process-transactions/stream")
+async def process_transactions_stream(
+    request: Request,
+    network: str = Query(...),
+    group_size: int = Query(1000, ge=1, le=100_000)
+):
+    """Process newline-delimited JSON transactions as they arrive, streaming NDJSON results
+    
+    Transactions are processed in vectorized groups of group_size on the
+    batch executor, waiting for a free slot when it is busy. Lines that
+    are not valid transaction objects or exceed MAX_LINE_BYTES produce an
+    error record and are skipped. Each result carries the "line" number of
+    its transaction, since error records are written as soon as they are
+    found. The last record carries the compliance report and energy field
+    snapshot.
+    """
+    energy_processor = await energy_processor_ready()
+    if network not in energy_processor.network_resonances:
+        raise HTTPException(status_code=404, detail="Network not supported")
+    
+    async def lines_and_groups() -> AsyncIterator[Any]:
+        """Yield error records for bad lines and full groups of parsed transactions with their line numbers"""
+        group = []
+        lines = []
+        line_number = 0
+        async for line in _ndjson_lines(request):
+            line_number += 1
+            if line is None:
+                yield {"error": LINE_TOO_LONG, "line": line_number}
+                continue
+            if not line.strip():
+                continue
+            try:
+                transaction = json.loads(line)
+                if not isinstance(transaction, dict):
+                    raise ValueError("Transaction must be a JSON object")
+                energy_processor.check_transaction(transaction)
+            except ValueError as e:
+                yield {"error": str(e), "line": line_number}
+                continue
             
-            # Process through energy system
-            result = await energy_processor.process_transaction(transaction, request.network)
-            processed.append(result)
+            group.append(transaction)
+            lines.append(line_number)
+            if len(group) >= group_size:
+                yield group, lines
+                group = []
+                lines = []
+        if group:
+            yield group, lines
+    
+    results = _stream_results(lines_and_groups(), network, "/process-transactions/stream",
+                              lambda errors: {"errors": errors})
+    return DuplexStreamingResponse(results, media_type="application/x-ndjson")
+
+# Lines parsed and encoded per hop to a worker thread
+XML_ENCODE_GROUP = 1000
+
+@app.post("/iso20022/xml")
+async def export_iso20022_xml(
+    request: Request,
+    message_size: int = Query(1000, ge=1, le=100_000)
+):
+    """Convert newline-delimited JSON transactions to grouped pacs.008/pacs.002 XML, streamed as it is written
+    
+    Transactions are grouped into messages of up to message_size per
+    message type, each with one group header carrying NbOfTxs and CtrlSum.
+    Lines that are not JSON objects, exceed MAX_LINE_BYTES, or lack a
+    valid amount or currency, are skipped and noted in an XML comment with
+    their line number.
+    """
+    chunks: List[bytes] = []
+    writer = get_iso_mapper().xml_writer(chunks.append, message_size)
+    
+    def encode(lines: List, close: bool = False) -> bytes:
+        for line_number, line in lines:
+            try:
+                if line is None:
+                    raise ValueError(LINE_TOO_LONG)
+                transaction = json.loads(line)
+                if not isinstance(transaction, dict):
+                    raise ValueError("Transaction must be a JSON object")
+                writer.add(transaction)
+            except ValueError as e:
+                writer.comment(f"Line {line_number} skipped: {e}")
+        if close:
+            writer.close()
+        output = b''.join(chunks)
+        chunks.clear()
+        return output
+    
+    async def xml() -> AsyncIterator[bytes]:
+        # Encoding runs on a worker thread so large uploads do not hold up the event loop
+        loop = asyncio.get_running_loop()
+        lines = []
+        line_number = 0
+        async for line in _ndjson_lines(request):
+            line_number += 1
+            if line is None or line.strip():
+                lines.append((line_number, line))
+            if len(lines) >= XML_ENCODE_GROUP:
+                output = await loop.run_in_executor(None, encode, lines)
+                lines = []
+                if output:
+                    yield output
+        yield await loop.run_in_executor(None, encode, lines, True)
+    
+    return DuplexStreamingResponse(xml(), media_type="application/xml")
+
+@app.post("/iso20022/upload")
+async def upload_iso20022_xml(
+    request: Request,
+    network: str = Query(...),
+    group_size: int = Query(1000, ge=1, le=100_000)
+):
+    """Process a pacs.008 or pain.001 XML upload as it arrives, streaming NDJSON results
+    
+    The body is parsed incrementally, so memory stays flat however large
+    the file is. Each CdtTrfTxInf becomes one transaction, processed in
+    groups of group_size on the batch executor like the NDJSON stream.
+    Malformed XML stops parsing with an error record. The last record
+    carries the parser's skip count and errors, the compliance report and
+    the energy field snapshot.
+    """
+    energy_processor = await energy_processor_ready()
+    if network not in energy_processor.network_resonances:
+        raise HTTPException(status_code=404, detail="Network not supported")
+    parser = ISO20022Parser()
+    
+    async def transaction_groups() -> AsyncIterator[Any]:
+        """Yield full groups of parsed transactions, then an error record if the XML is malformed"""
+        # Parsing runs on a worker thread so large uploads do not hold up the event loop
+        loop = asyncio.get_running_loop()
+        group = []
+        error = None
+        try:
+            async for chunk in request.stream():
+                group.extend(await loop.run_in_executor(None, parser.feed, chunk))
+                while len(group) >= group_size:
+                    yield group[:group_size], None
+                    group = group[group_size:]
+            group.extend(await loop.run_in_executor(None, parser.close))
+        except ParseError as e:
+            # Entries read before the error are still processed; nothing after it can be read
+            error = {"error": f"Malformed XML: {e}"}
+        while group:
+            yield group[:group_size], None
+            group = group[group_size:]
+        if error is not None:
+            yield error
+    
+    results = _stream_results(transaction_groups(), network, "/iso20022/upload",
+                              lambda errors: {"skipped": parser.skipped, "errors": parser.errors})
+    return DuplexStreamingResponse(results, media_type="application/x-ndjson")
+
+async def _process_job_chunk(transactions: List[Dict], network: str) -> List[bytes]:
+    # Jobs wait for a free slot rather than being shed, like streams
+    return await batch_executor.run(_process_records, transactions, network, timeout=REQUEST_TIMEOUT, wait=True)
+
+JOBS_DIR = os.environ.get('MCP_JOBS_DIR', os.path.join(tempfile.gettempdir(), 'energy-jobs'))
+_job_runner = None
+
+def get_job_runner():
+    """Bulk job runner; jobs are spooled to disk and processed in the background, surviving restarts"""
+    global _job_runner
+    if _job_runner is None:
+        from core.bulk_jobs import BulkJobRunner, JobStore
+        from core.energy_processor import QuantumFinancialEnergyProcessor
+        _job_runner = BulkJobRunner(
+            JobStore(JOBS_DIR),
+            _process_job_chunk,
+            _ndjson,
+            concurrency=int(os.environ.get('MCP_JOB_CONCURRENCY', '1')),
+            validate=QuantumFinancialEnergyProcessor.check_transaction
+        )
+    return _job_runner
+
+@app.on_event("startup")
+async def resume_jobs():
+    # Without stored jobs there is nothing to resume, and the runner waits for its first use
+    if os.path.isdir(JOBS_DIR) and os.listdir(JOBS_DIR):
+        get_job_runner().recover()
+
+def _get_job(job_id: str):
+    job_runner = get_job_runner()
+    if job_id not in job_runner.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_runner.jobs[job_id]
+
+@app.post("/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    network: str = Query(...),
+    chunk_size: int = Query(10_000, ge=1, le=100_000)
+):
+    """Submit a newline-delimited JSON transaction file for background processing
+    
+    The file is sent either as the raw request body, which is spooled to
+    disk as it arrives, or as the "file" field of a multipart form. The
+    job id in the response is used to follow progress and page results.
+    """
+    energy_processor = await energy_processor_ready()
+    job_runner = get_job_runner()
+    if network not in energy_processor.network_resonances:
+        raise HTTPException(status_code=404, detail="Network not supported")
+    
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart uploads need a file field named 'file'")
         
-        # Generate compliance report
-        compliance_report = iso_mapper.generate_compliance_report(processed)
+        async def chunks() -> AsyncIterator[bytes]:
+            while True:
+                chunk = await upload.read(1 << 20)
+                if not chunk:
+                    return
+                yield chunk
         
-        return EnergyResponse(
-            results=processed,
-            energy_field_snapshot=energy_processor.get_energy_snapshot(),
-            compliance_report=compliance_report
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        job = await job_runner.submit(network, chunks(), chunk_size)
+        await form.close()
+    else:
+        job = await job_runner.submit(network, request.stream(), chunk_size)
+    return JSONResponse(job.to_dict(), status_code=202, headers={"Location": f"/jobs/{job.id}"})
+
+@app.get("/jobs")
+async def list_jobs():
+    """List bulk jobs, newest first"""
+    jobs = sorted(get_job_runner().jobs.values(), key=lambda job: job.created_at, reverse=True)
+    return {"jobs": [job.to_dict() for job in jobs]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status and progress of a bulk job"""
+    return _get_job(job_id).to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Stop a bulk job after the chunk in progress"""
+    _get_job(job_id)
+    try:
+        return get_job_runner().cancel(job_id).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: str):
+    """Continue a cancelled or failed bulk job from its last checkpoint"""
+    _get_job(job_id)
+    try:
+        return get_job_runner().resume(job_id).to_dict()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.delete("/jobs/{job_id}", status_code=204)
+async def delete_job(job_id: str):
+    """Delete a finished bulk job and its stored results"""
+    _get_job(job_id)
+    try:
+        get_job_runner().delete(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(status_code=204)
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10_000)
+):
+    """Page through the results of a bulk job, one record per input line, read from disk
+    
+    Results are available as soon as their chunk is checkpointed, so a
+    running job can be paged while it progresses.
+    """
+    job = _get_job(job_id)
+    records = get_job_runner().results(job_id, offset, limit)
+    next_offset = offset + len(records)
+    # Records are stored as JSON already, so the page is assembled without decoding them
+    header = json.dumps({
+        "job_id": job_id,
+        "status": job.status,
+        "offset": offset,
+        "count": len(records),
+        "next_offset": next_offset if next_offset < job.result_count or job.status in ('queued', 'running') else None,
+        "total": job.result_count
+    })
+    body = header[:-1].encode() + b',"results":[' + b','.join(record.rstrip(b'\n') for record in records) + b']}'
+    return Response(body, media_type="application/json")
+
+# Serialized read responses, reused until the processor state they show changes
+response_cache = ResponseCache(
+    lambda data: json.dumps(data, default=_json_default, ensure_ascii=False, separators=(',', ':')).encode()
+)
+
+def _field_version():
+    """Version of the field state behind /energy-field, or None when it cannot be cached"""
+    from core.energy_field import SharedEnergyField
+    energy_processor = get_energy_processor()
+    if energy_processor.half_life:
+        # A decaying field changes with the clock alone
+        return None
+    if isinstance(energy_processor.energy_field, SharedEnergyField):
+        # Other workers update a shared field without touching this processor's version
+        return energy_processor.field_version, energy_processor.energy_field.update_count
+    return energy_processor.field_version
 
 @app.get("/network-resonance/{network}")
-async def get_network_resonance(network: str):
+async def get_network_resonance(network: str, request: Request):
     """Get resonance information for a specific network"""
+    energy_processor = await energy_processor_ready()
     if network not in energy_processor.network_resonances:
         raise HTTPException(status_code=404, detail="Network not supported")
     
+    def build():
+        return {
+            "network": network,
+            "resonance": energy_processor.network_resonances[network],
+            "optimal_timing": energy_processor._calculate_resonance_timing(network).isoformat()
+        }
+    
+    # The cached timing is served until it passes
+    return response_cache.respond(
+        request, f"network-resonance/{network}", energy_processor.resonance_version, build,
+        valid_until=lambda data: datetime.fromisoformat(data["optimal_timing"]).timestamp()
+    )
+
+@app.get("/resonance-schedule")
+async def get_resonance_schedule(
+    peaks: int = Query(5, ge=1, le=1000),
+    networks: Optional[str] = Query(None, description="Comma-separated networks, all when omitted")
+):
+    """Get the next resonance peaks for every network in one call"""
+    energy_processor = await energy_processor_ready()
+    selected = None
+    if networks:
+        selected = [network.strip() for network in networks.split(',') if network.strip()]
+        unsupported = [network for network in selected if network not in energy_processor.network_resonances]
+        if unsupported:
+            raise HTTPException(status_code=404, detail=f"Network not supported: {', '.join(unsupported)}")
+    
+    schedule = energy_processor.resonance_schedule(peaks, selected)
     return {
-        "network": network,
-        "resonance": energy_processor.network_resonances[network],
-        "optimal_timing": energy_processor._calculate_resonance_timing(network).isoformat()
+        "peaks": peaks,
+        "schedule": {
+            network: [peak.isoformat() for peak in times]
+            for network, times in schedule.items()
+        }
     }
 
 @app.get("/energy-field")
-async def get_energy_field():
+async def get_energy_field(request: Request):
     """Get current energy field state"""
-    return energy_processor.get_energy_snapshot()
+    energy_processor = await energy_processor_ready()
+    version = _field_version()
+    if version is None:
+        return energy_processor.get_energy_snapshot()
+    return response_cache.respond(request, "energy-field", version, energy_processor.get_energy_snapshot)
+
+_field_broadcaster = None
+
+def get_field_broadcaster():
+    global _field_broadcaster
+    if _field_broadcaster is None:
+        from core.field_broadcaster import FieldDeltaBroadcaster
+        _field_broadcaster = FieldDeltaBroadcaster(
+            get_energy_processor(),
+            lambda message: json.dumps(message, separators=(',', ':')).encode(),
+            interval=float(os.environ.get('MCP_STREAM_INTERVAL_MS', '100')) / 1000,
+            max_cells=int(os.environ.get('MCP_STREAM_MAX_CELLS', '10000'))
+        )
+    return _field_broadcaster
+STREAM_KEEPALIVE = 15.0
+
+@app.get("/energy-field/stream")
+async def stream_energy_field():
+    """Server-sent events with the changed cells and aggregates of the energy field, once per tick
+    
+    The first event is a full snapshot; later events are deltas. A client
+    that falls too far behind is sent a fresh snapshot instead.
+    """
+    await energy_processor_ready()
+    field_broadcaster = get_field_broadcaster()
+    subscription = field_broadcaster.subscribe()
+    
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            while True:
+                try:
+                    data = await asyncio.wait_for(subscription.next(field_broadcaster), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"data: " + data + b"\n\n"
+        finally:
+            field_broadcaster.unsubscribe(subscription)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/energy-field/region")
+async def get_energy_field_region(
+    x_min: int = Query(..., ge=0),
+    x_max: int = Query(..., ge=0),
+    y_min: int = Query(..., ge=0),
+    y_max: int = Query(..., ge=0)
+):
+    """Get energy statistics over an inclusive rectangle of the energy field"""
+    energy_processor = await energy_processor_ready()
+    if energy_processor.region_index is None:
+        raise HTTPException(status_code=404, detail="Region index is not enabled")
+    try:
+        # The query takes the processor lock, which batch threads hold across field updates
+        region = await asyncio.get_running_loop().run_in_executor(
+            None, energy_processor.region_snapshot, x_min, x_max, y_min, y_max
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"x_min": x_min, "x_max": x_max, "y_min": y_min, "y_max": y_max, **region}
+
+@app.get("/scheduled-executions/{ticket}")
+async def get_scheduled_execution(
+    ticket: int,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for a pending execution to be released")
+):
+    """Get the state of a scheduled result: pending, released or cancelled"""
+    scheduler = get_scheduler()
+    if wait and scheduler.is_pending(ticket):
+        waiter = _execution_waiters.setdefault(ticket, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), wait)
+        except asyncio.TimeoutError:
+            pass
+    if ticket in _executions:
+        return {"ticket": ticket, **_executions[ticket]}
+    if scheduler.is_pending(ticket):
+        return {"ticket": ticket, "status": "pending"}
+    raise HTTPException(status_code=404, detail="Scheduled execution not found")
+
+@app.delete("/scheduled-executions/{ticket}", status_code=204)
+async def cancel_scheduled_execution(ticket: int):
+    """Cancel a pending scheduled result"""
+    if not get_scheduler().cancel(ticket):
+        raise HTTPException(status_code=404, detail="Scheduled execution is not pending")
+    _finish_execution(ticket, {"status": "cancelled", "cancelled_at": datetime.now().isoformat()})
+    return Response(status_code=204)
+
+@app.get("/execution-metrics")
+async def get_execution_metrics():
+    """Get batch executor, request coalescer, scheduler and idempotency cache statistics"""
+    energy_processor = await energy_processor_ready()
+    idempotency_cache = energy_processor.idempotency_cache
+    return {
+        "executor": batch_executor.metrics(),
+        "coalescer": coalescer.metrics() if coalescer is not None else None,
+        "scheduler": get_scheduler().metrics(),
+        "idempotency": idempotency_cache.stats() if idempotency_cache is not None else None,
+        "response_cache": response_cache.stats()
+    }
+
+def _hit_rate(hits: int, misses: int) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+def _cache_hit_rates() -> Dict:
+    energy_processor = get_energy_processor()
+    intent = energy_processor.intent_classifier.cache_info()
+    idempotency_cache = energy_processor.idempotency_cache
+    return {
+        ('intent',): _hit_rate(intent['hits'], intent['misses']),
+        ('idempotency',): idempotency_cache.stats()['hit_rate'] if idempotency_cache is not None else None,
+        ('response',): _hit_rate(response_cache.hits, response_cache.misses)
+    }
+
+request_errors = metrics.counter('mcp_request_errors_total', 'Failed processing requests', ('endpoint', 'error'))
+metrics.gauge('energy_field_cells_occupied', 'Energy field cells holding a value',
+              lambda: get_energy_processor().energy_field.occupied)
+metrics.gauge('energy_field_updates', 'Updates applied to the energy field',
+              lambda: get_energy_processor().energy_field.update_count)
+metrics.gauge('energy_history_length', 'Transactions retained in the in-memory history',
+              lambda: len(get_energy_processor().transaction_history))
+metrics.gauge('energy_cache_hit_rate', 'Hit rate of processing and response caches', _cache_hit_rates, ('cache',))
+metrics.gauge('mcp_executor_in_flight', 'Batches admitted to the batch executor', lambda: batch_executor.in_flight)
+metrics.gauge('mcp_executor_rejected', 'Batches shed with 503 since start', lambda: batch_executor.rejected)
+metrics.gauge('mcp_scheduler_pending', 'Results waiting for their optimal execution time',
+              lambda: _scheduler.pending if _scheduler is not None else 0)
+metrics.gauge('mcp_scheduler_lateness_max_seconds', 'Largest delay of a scheduled release past its due time',
+              lambda: _scheduler.lateness_max if _scheduler is not None else 0.0)
+metrics.gauge('mcp_jobs', 'Bulk jobs by state', lambda: get_job_runner().counts(), ('state',))
+metrics.gauge('mcp_stream_subscribers', 'Energy field stream subscribers',
+              lambda: len(_field_broadcaster.subscribers) if _field_broadcaster is not None else 0)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus metrics: stage latency histograms, counters and gauges"""
+    await energy_processor_ready()
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/supported-networks")
-async def get_supported_networks():
+async def get_supported_networks(request: Request):
     """Get list of supported networks"""
-    return {
-        "networks": list(energy_processor.network_resonances.keys()),
-        "count": len(energy_processor.network_resonances)
+    energy_processor = await energy_processor_ready()
+    def build():
+        return {
+            "networks": list(energy_processor.network_resonances.keys()),
+            "count": len(energy_processor.network_resonances)
+        }
+    
+    return response_cache.respond(request, "supported-networks", energy_processor.resonance_version, build)
+
+def __getattr__(name: str):
+    # Former module-level singletons, now created on first access
+    accessors = {
+        "energy_processor": get_energy_processor,
+        "iso_mapper": get_iso_mapper,
+        "job_runner": get_job_runner,
+        "field_broadcaster": get_field_broadcaster
     }
+    if name in accessors:
+        return accessors[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
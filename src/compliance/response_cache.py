@@ -0,0 +1,63 @@
+import hashlib
+import time
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+
+class CachedResponse(NamedTuple):
+    version: Hashable
+    etag: str
+    body: bytes
+    valid_until: Optional[float]
+
+
+class ResponseCache:
+    """Serialized read-endpoint responses, reused while the state they show is unchanged
+
+    Each entry is tagged with the state version it was built from and,
+    for time-dependent data, a wall-clock expiry. Bodies carry a strong
+    ETag derived from their bytes, and a request whose If-None-Match names
+    the current ETag gets an empty 304.
+    """
+
+    def __init__(self, serialize: Callable[[Any], bytes]):
+        self.serialize = serialize
+        self._entries: Dict[str, CachedResponse] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def respond(self, request: Request, key: str, version: Hashable, build: Callable[[], Any],
+                valid_until: Optional[Callable[[Any], Optional[float]]] = None) -> Response:
+        """Answer request from the entry for key, rebuilding it when version changed or it expired"""
+        entry = self._entries.get(key)
+        if (entry is None or entry.version != version
+                or (entry.valid_until is not None and time.time() >= entry.valid_until)):
+            self.misses += 1
+            data = build()
+            body = self.serialize(data)
+            etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            entry = CachedResponse(version, etag, body, valid_until(data) if valid_until else None)
+            self._entries[key] = entry
+        else:
+            self.hits += 1
+
+        headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+        if _etag_matches(request.headers.get('if-none-match'), entry.etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type='application/json', headers=headers)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit and 304 counters"""
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'not_modified': self.not_modified}
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = [candidate.strip().removeprefix('W/') for candidate in header.split(',')]
+    return '*' in candidates or etag in candidates
@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .batch_executor import ExecutorFull
+
+
+class BatchCoalescer:
+    """Merge transactions from concurrent requests into one batch per network
+
+    The first submission for a network opens a window; everything submitted
+    for that network until window seconds have passed, or until max_items
+    transactions are waiting, is handed to the handler as a single batch.
+    Each caller gets back the slice of results for its own transactions. If
+    a merged batch fails, it is split in halves and retried until the bad
+    requests are isolated, so a bad transaction only fails the request that
+    sent it; load shedding and deadline errors go to every request as is.
+    """
+
+    def __init__(self, handler: Callable[[List[Dict], str], Awaitable[List[Dict]]],
+                 window: float = 0.002, max_items: int = 512):
+        self.handler = handler
+        self.window = window
+        self.max_items = max_items
+        self._pending: Dict[str, List[Tuple[List[Dict], asyncio.Future, float]]] = {}
+        self._counts: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._started: Optional[float] = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+        self.batch_size_max = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.retried = 0
+
+    async def submit(self, transactions: List[Dict], network: str) -> List[Dict]:
+        """Queue transactions for the next batch on network and wait for their results"""
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now
+        future = loop.create_future()
+        self._pending.setdefault(network, []).append((transactions, future, now))
+        self._counts[network] = self._counts.get(network, 0) + len(transactions)
+
+        if self._counts[network] >= self.max_items:
+            self._flush(network)
+        elif network not in self._timers:
+            self._timers[network] = loop.call_later(self.window, self._flush, network)
+        return await future
+
+    def _flush(self, network: str):
+        timer = self._timers.pop(network, None)
+        if timer is not None:
+            timer.cancel()
+        entries = self._pending.pop(network, [])
+        self._counts.pop(network, None)
+        # Requests that gave up while waiting are left out of the batch
+        entries = [entry for entry in entries if not entry[1].done()]
+        if not entries:
+            return
+
+        now = time.monotonic()
+        size = sum(len(transactions) for transactions, _, _ in entries)
+        self.batches += 1
+        self.items += size
+        self.requests += len(entries)
+        self.batch_size_max = max(self.batch_size_max, size)
+        for _, _, submitted in entries:
+            self.wait_total += now - submitted
+            self.wait_max = max(self.wait_max, now - submitted)
+        task = asyncio.ensure_future(self._dispatch(entries, network))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, entries: List[Tuple[List[Dict], asyncio.Future, float]], network: str):
+        batch = [transaction for transactions, _, _ in entries for transaction in transactions]
+        try:
+            results = await self.handler(batch, network)
+        except Exception as e:
+            if len(entries) == 1 or isinstance(e, (ExecutorFull, asyncio.TimeoutError)):
+                for _, future, _ in entries:
+                    _resolve(future, exception=e)
+                return
+            # Bisect until the failing requests are isolated
+            self.retried += len(entries)
+            middle = len(entries) // 2
+            await self._dispatch(entries[:middle], network)
+            await self._dispatch(entries[middle:], network)
+            return
+
+        offset = 0
+        for transactions, future, _ in entries:
+            _resolve(future, results[offset:offset + len(transactions)])
+            offset += len(transactions)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Batch size, added wait and throughput statistics"""
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        return {
+            'window': self.window,
+            'max_items': self.max_items,
+            'batches': self.batches,
+            'requests': self.requests,
+            'transactions': self.items,
+            'batch_size_mean': self.items / self.batches if self.batches else 0.0,
+            'batch_size_max': self.batch_size_max,
+            'wait_mean': self.wait_total / self.requests if self.requests else 0.0,
+            'wait_max': self.wait_max,
+            'retried_requests': self.retried,
+            'throughput': self.items / elapsed if elapsed else 0.0
+        }
+
+
+def _resolve(future: asyncio.Future, result: Any = None, exception: Optional[BaseException] = None):
+    if future.done():
+        return
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(result)
@@ -0,0 +1,146 @@
+import asyncio
+import math
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+EXECUTION_MODES = ('inline', 'thread', 'process')
+
+
+class ExecutorFull(Exception):
+    """Raised when every worker is busy and the submission queue is full"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BatchExecutor:
+    """Run CPU-bound batch work off the event loop with bounded admission
+
+    Jobs run on a thread pool or a spawned process pool ('inline' runs them
+    on the loop, as before). At most workers + max_queue jobs are admitted
+    at once; further submissions raise ExecutorFull, carrying a Retry-After
+    estimate from the mean job duration, so callers can shed load instead of
+    piling up work. A deadline covers queueing and execution: a job still
+    queued when it expires never starts, while a running job finishes but
+    its result is dropped. Such a job keeps its slot until it ends, so
+    the bound also holds under timeouts.
+
+    Process workers hold their own copy of any state the job touches, so
+    that mode is only coherent for state kept outside the process, such as
+    the shared energy field.
+    """
+
+    def __init__(self, mode: str = 'thread', workers: int = 4, max_queue: int = 64):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode '{mode}', expected one of {', '.join(EXECUTION_MODES)}")
+        if workers < 1 or max_queue < 0:
+            raise ValueError("Workers must be at least 1 and the queue size non-negative")
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.duration_total = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    def _executor(self) -> Optional[Executor]:
+        if self._pool is None and self.mode == 'thread':
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='batch')
+        elif self._pool is None and self.mode == 'process':
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, at least 1"""
+        mean = self.duration_total / self.completed if self.completed else 1.0
+        return max(1, math.ceil(mean * self.in_flight / self.workers))
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, wait: bool = False) -> Any:
+        """Run fn(*args) on the pool and return its result
+
+        Raises ExecutorFull when no slot is free, unless wait is set, and
+        asyncio.TimeoutError once timeout seconds have passed.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Admission slots belong to one event loop
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.capacity)
+        if self._slots.locked() and not wait:
+            self.rejected += 1
+            raise ExecutorFull(f"{self.in_flight} batches already admitted", self.retry_after())
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise
+        self.in_flight += 1
+        slots = self._slots
+        start = time.monotonic()
+        if self.mode == 'inline':
+            try:
+                result = fn(*args)
+            finally:
+                self._release(slots)
+        else:
+            try:
+                job = self._executor().submit(fn, *args)
+            except Exception:
+                self._release(slots)
+                raise
+            # The slot is freed when the job itself ends rather than when the wait for it does
+            job.add_done_callback(lambda _: self._job_done(loop, slots))
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                # Cancelling the wrapper also cancels the pool job if it has not started
+                result = await asyncio.wait_for(asyncio.wrap_future(job, loop=loop), remaining)
+            except asyncio.TimeoutError:
+                self.expired += 1
+                raise
+        self.completed += 1
+        self.duration_total += time.monotonic() - start
+        return result
+
+    def _release(self, slots: asyncio.Semaphore):
+        self.in_flight -= 1
+        slots.release()
+
+    def _job_done(self, loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore):
+        # Called on the worker thread, or on the loop when a queued job is cancelled
+        try:
+            loop.call_soon_threadsafe(self._release, slots)
+        except RuntimeError:
+            # The loop is closed, and its slots with it
+            pass
+
+    def metrics(self) -> Dict[str, Any]:
+        """Admission and duration statistics"""
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'expired': self.expired,
+            'duration_mean': self.duration_total / self.completed if self.completed else 0.0
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
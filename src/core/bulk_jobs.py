@@ -0,0 +1,341 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+JOB_STATES = ('receiving', 'queued', 'running', 'completed', 'failed', 'cancelled')
+# Byte offset where each result record starts in results.ndjson
+INDEX_DTYPE = np.dtype('<u8')
+
+
+class Job:
+    """Progress and checkpoint of one bulk job, persisted as job.json"""
+
+    FIELDS = ('id', 'network', 'status', 'chunk_size', 'total', 'input_bytes', 'input_offset', 'lines_read',
+              'processed', 'errors', 'result_count', 'result_bytes', 'cancel_requested', 'error',
+              'created_at', 'updated_at', 'finished_at')
+
+    def __init__(self, id: str, network: str, chunk_size: int, status: str = 'receiving', total: int = 0,
+                 input_bytes: int = 0, input_offset: int = 0, lines_read: int = 0, processed: int = 0,
+                 errors: int = 0, result_count: int = 0, result_bytes: int = 0, cancel_requested: bool = False,
+                 error: Optional[str] = None, created_at: Optional[float] = None,
+                 updated_at: Optional[float] = None, finished_at: Optional[float] = None):
+        self.id = id
+        self.network = network
+        self.chunk_size = chunk_size
+        self.status = status
+        # Input lines, known once the upload is complete
+        self.total = total
+        self.input_bytes = input_bytes
+        # Checkpoint: input consumed and results written by the last completed chunk
+        self.input_offset = input_offset
+        self.lines_read = lines_read
+        self.processed = processed
+        self.errors = errors
+        self.result_count = result_count
+        self.result_bytes = result_bytes
+        self.cancel_requested = cancel_requested
+        self.error = error
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+        self.finished_at = finished_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        state = {name: getattr(self, name) for name in self.FIELDS}
+        state['progress'] = self.lines_read / self.total if self.total else float(self.status == 'completed')
+        return state
+
+
+class JobStore:
+    """Bulk job inputs, results and checkpoints on disk
+
+    Each job has a directory holding the uploaded NDJSON input, one NDJSON
+    result record per input line, an index of the byte offset where each
+    result starts, and job.json. After every chunk the results are appended
+    and made durable before job.json is atomically replaced, so job.json is
+    a consistent checkpoint: anything written past its counts belongs to an
+    interrupted chunk and is discarded when the job resumes. Results are
+    read a page at a time through the index, never loaded whole.
+    """
+
+    def __init__(self, directory: str, fsync: bool = True):
+        self.directory = directory
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id: str, name: str = '') -> str:
+        return os.path.join(self.directory, job_id, name)
+
+    def create(self, network: str, chunk_size: int) -> Job:
+        job = Job(uuid.uuid4().hex, network, chunk_size)
+        os.makedirs(self._path(job.id))
+        self.save(job)
+        return job
+
+    def save(self, job: Job):
+        """Atomically replace the job's checkpoint"""
+        job.updated_at = time.time()
+        path = self._path(job.id, 'job.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump({name: getattr(job, name) for name in Job.FIELDS}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def load_all(self) -> Dict[str, Job]:
+        jobs = {}
+        for job_id in os.listdir(self.directory):
+            path = self._path(job_id, 'job.json')
+            if os.path.exists(path):
+                with open(path) as f:
+                    jobs[job_id] = Job(**json.load(f))
+        return jobs
+
+    def delete(self, job_id: str):
+        shutil.rmtree(self._path(job_id), ignore_errors=True)
+
+    def open_input(self, job: Job):
+        return open(self._path(job.id, 'input.ndjson'), 'wb')
+
+    def read_chunk(self, job: Job) -> Tuple[List[Tuple[int, bytes]], int, int]:
+        """Up to chunk_size non-empty (line number, line) pairs after the checkpoint
+
+        Also returns the file offset and line number reached, for the next checkpoint.
+        """
+        lines = []
+        line_number = job.lines_read
+        with open(self._path(job.id, 'input.ndjson'), 'rb') as f:
+            f.seek(job.input_offset)
+            while len(lines) < job.chunk_size:
+                line = f.readline()
+                if not line:
+                    break
+                line_number += 1
+                if line.strip():
+                    lines.append((line_number, line))
+            return lines, f.tell(), line_number
+
+    def rewind(self, job: Job):
+        """Drop results written after the checkpoint by an interrupted chunk"""
+        for name, size in (('results.ndjson', job.result_bytes),
+                           ('results.idx', job.result_count * INDEX_DTYPE.itemsize)):
+            path = self._path(job.id, name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def append_results(self, job: Job, records: List[bytes]):
+        """Durably append result records, each ending in a newline; the caller then saves the checkpoint"""
+        if not records:
+            return
+        sizes = np.fromiter((len(record) for record in records), dtype=INDEX_DTYPE, count=len(records))
+        offsets = job.result_bytes + np.concatenate([[0], np.cumsum(sizes[:-1])]).astype(INDEX_DTYPE)
+        for name, data in (('results.ndjson', b''.join(records)), ('results.idx', offsets.tobytes())):
+            with open(self._path(job.id, name), 'ab') as f:
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        job.result_count += len(records)
+        job.result_bytes += int(sizes.sum())
+
+    def read_results(self, job: Job, offset: int, limit: int) -> List[bytes]:
+        """Result records offset to offset + limit, as far as the checkpoint"""
+        count = max(0, min(limit, job.result_count - offset))
+        if not count:
+            return []
+        with open(self._path(job.id, 'results.idx'), 'rb') as f:
+            f.seek(offset * INDEX_DTYPE.itemsize)
+            starts = np.frombuffer(f.read((count + 1) * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE).tolist()
+        # The last page ends at the checkpoint, not at whatever an interrupted chunk wrote after it
+        bounds = starts[:count] + [starts[count] if offset + count < job.result_count else job.result_bytes]
+        with open(self._path(job.id, 'results.ndjson'), 'rb') as f:
+            f.seek(bounds[0])
+            data = f.read(bounds[-1] - bounds[0])
+        return [data[start - bounds[0]:end - bounds[0]] for start, end in zip(bounds, bounds[1:])]
+
+
+class BulkJobRunner:
+    """Process uploaded transaction files in the background, chunk by chunk
+
+    submit() spools an upload to the job store and queues it; at most
+    concurrency jobs run at once. A running job reads chunk_size lines from
+    its checkpoint, hands the transactions to handler(transactions, network),
+    which returns one encoded result record per transaction, and
+    checkpoints the results. Lines that are not JSON objects, or that
+    validate(transaction) rejects with ValueError, get an error record in
+    their place. Cancellation takes effect between chunks, a
+    failed chunk fails the job, and either can be resumed from the last
+    checkpoint; jobs interrupted by a restart are resumed by recover().
+
+    A chunk interrupted before its checkpoint is processed again on resume,
+    so transactions should carry ids for the idempotency cache to keep
+    them from reaching the energy field twice.
+    """
+
+    def __init__(self, store: JobStore, handler: Callable[[List[Dict], str], Awaitable[List[bytes]]],
+                 encode: Callable[[Dict], bytes], concurrency: int = 1,
+                 validate: Optional[Callable[[Dict], None]] = None):
+        if concurrency < 1:
+            raise ValueError("Job concurrency must be at least 1")
+        self.store = store
+        self.handler = handler
+        self.encode = encode
+        self.concurrency = concurrency
+        self.validate = validate
+        self.jobs: Dict[str, Job] = store.load_all()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, network: str, chunks: AsyncIterator[bytes], chunk_size: int) -> Job:
+        """Spool an NDJSON upload to disk and queue it"""
+        job = self.store.create(network, chunk_size)
+        self.jobs[job.id] = job
+        loop = asyncio.get_running_loop()
+        lines = 0
+        last = b'\n'
+        try:
+            with self.store.open_input(job) as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    await loop.run_in_executor(None, f.write, chunk)
+                    job.input_bytes += len(chunk)
+                    lines += chunk.count(b'\n')
+                    last = chunk[-1:]
+        except BaseException:
+            self.store.delete(job.id)
+            del self.jobs[job.id]
+            raise
+        # Counted as lines for progress; blank lines finish without a result
+        job.total = lines + (last != b'\n')
+        job.status = 'queued'
+        self.store.save(job)
+        self._start(job)
+        return job
+
+    def recover(self):
+        """Resume jobs left queued or running by a previous process"""
+        for job in self.jobs.values():
+            if job.status in ('queued', 'running'):
+                job.status = 'queued'
+                self._start(job)
+            elif job.status == 'receiving':
+                job.status = 'failed'
+                job.error = "Upload was interrupted"
+                self.store.save(job)
+
+    def cancel(self, job_id: str) -> Job:
+        """Stop a job after its current chunk; a queued job stops at once"""
+        job = self.jobs[job_id]
+        if job.status not in ('queued', 'running'):
+            raise ValueError(f"Job is {job.status}")
+        job.cancel_requested = True
+        if job.status == 'queued':
+            self._tasks[job.id].cancel()
+            self._finish(job, 'cancelled')
+        return job
+
+    def resume(self, job_id: str) -> Job:
+        """Queue a cancelled or failed job again from its last checkpoint"""
+        job = self.jobs[job_id]
+        if job.status not in ('cancelled', 'failed'):
+            raise ValueError(f"Job is {job.status}")
+        job.status = 'queued'
+        job.cancel_requested = False
+        job.error = None
+        job.finished_at = None
+        self.store.save(job)
+        self._start(job)
+        return job
+
+    def delete(self, job_id: str):
+        """Remove a job that is not queued or running, with its files"""
+        job = self.jobs[job_id]
+        if job.status in ('queued', 'running'):
+            raise ValueError(f"Job is {job.status}")
+        del self.jobs[job_id]
+        self.store.delete(job_id)
+
+    def results(self, job_id: str, offset: int, limit: int) -> List[bytes]:
+        return self.store.read_results(self.jobs[job_id], offset, limit)
+
+    def counts(self) -> Dict[Tuple[str], int]:
+        """Jobs per state"""
+        counts = {(state,): 0 for state in JOB_STATES}
+        for job in self.jobs.values():
+            counts[(job.status,)] += 1
+        return counts
+
+    def _start(self, job: Job):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Job slots belong to one event loop
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.concurrency)
+        task = loop.create_task(self._run(job))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda done: self._forget(job.id, done))
+
+    def _forget(self, job_id: str, task: asyncio.Task):
+        # A resumed job may already have a newer task
+        if self._tasks.get(job_id) is task:
+            del self._tasks[job_id]
+
+    def _finish(self, job: Job, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = time.time()
+        self.store.save(job)
+
+    async def _run(self, job: Job):
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            if job.status != 'queued':
+                return
+            job.status = 'running'
+            await loop.run_in_executor(None, self.store.rewind, job)
+            self.store.save(job)
+            try:
+                while not job.cancel_requested:
+                    lines, offset, line_number = await loop.run_in_executor(None, self.store.read_chunk, job)
+                    if offset == job.input_offset:
+                        break
+                    await self._process_chunk(job, lines, offset, line_number)
+            except Exception as e:
+                self._finish(job, 'failed', f"{type(e).__name__}: {e}")
+                return
+            self._finish(job, 'cancelled' if job.cancel_requested else 'completed')
+
+    async def _process_chunk(self, job: Job, lines: List[Tuple[int, bytes]], offset: int, line_number: int):
+        records: List[Optional[bytes]] = []
+        transactions = []
+        for input_line, line in lines:
+            try:
+                transaction = json.loads(line)
+                if not isinstance(transaction, dict):
+                    raise ValueError("Transaction must be a JSON object")
+                if self.validate is not None:
+                    self.validate(transaction)
+            except ValueError as e:
+                records.append(self.encode({"error": str(e), "line": input_line}))
+                continue
+            transactions.append(transaction)
+            records.append(None)
+
+        results = iter(await self.handler(transactions, job.network) if transactions else [])
+        records = [record if record is not None else next(results) for record in records]
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store.append_results, job, records)
+        job.input_offset = offset
+        job.lines_read = line_number
+        job.processed += len(transactions)
+        job.errors += len(records) - len(transactions)
+        await loop.run_in_executor(None, self.store.save, job)
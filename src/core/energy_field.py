@@ -0,0 +1,610 @@
+import cmath
+import fcntl
+import multiprocessing
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Type
+
+
+# Columns of the running aggregate table; the *_ERROR columns hold the
+# compensation terms of the Neumaier summation of MAGNITUDE and PHASE
+MAGNITUDE, PHASE, COUNT, MAGNITUDE_ERROR, PHASE_ERROR = range(5)
+AGGREGATE_COLUMNS = 5
+
+
+class EnergyField:
+    """Base class for energy field storage backends
+
+    Backends keep running sums of cell magnitudes and phases: every update
+    subtracts the touched cells' old contribution and adds the new one, so
+    snapshots never reduce over the grid. The sums are accumulated in
+    float64 with Neumaier compensation whatever the cell dtype, so a
+    complex64 field only loses precision in the cells themselves. With
+    recompute_interval set, the sums are rebuilt from the cells every that
+    many updates to stop floating-point drift from accumulating.
+    """
+
+    def __init__(self, grid_size: int = 1000, dtype=complex, recompute_interval: Optional[int] = None,
+                 rows: Optional[int] = None):
+        self.grid_size = grid_size
+        # Row count of the stored band; a full field stores grid_size rows
+        self.rows = rows or grid_size
+        self.dtype = np.dtype(dtype)
+        self.recompute_interval = recompute_interval
+        self.max_drift = 0.0
+        self._updates_since_recompute = 0
+        # One row of aggregates per lock stripe; single-process backends use one row
+        self._totals = np.zeros((1, AGGREGATE_COLUMNS))
+        # Notified with the old and new values of every cell this process updates
+        self.observers: List = []
+
+    @property
+    def size(self) -> int:
+        """Number of cells in the full grid, occupied or not"""
+        return self.grid_size * self.grid_size
+
+    @property
+    def occupied(self) -> int:
+        """Number of cells holding a stored value"""
+        raise NotImplementedError
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by cell storage arrays"""
+        raise NotImplementedError
+
+    @property
+    def magnitude_sum(self) -> float:
+        return float(self.aggregate_totals()[MAGNITUDE])
+
+    @property
+    def phase_sum(self) -> float:
+        return float(self.aggregate_totals()[PHASE])
+
+    @property
+    def update_count(self) -> int:
+        return int(self.aggregate_totals()[COUNT])
+
+    def add(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray):
+        """Scatter-add states into the field, accumulating repeated cells in order"""
+        self._add_totals(self._totals[0], *self._accumulate(xs, ys, states))
+        self._count_updates(len(states))
+
+    def add_one(self, x: int, y: int, state: complex):
+        """Add a single state to one cell"""
+        self._add_totals(self._totals[0], *self._accumulate_one(x, y, state))
+        self._count_updates(1)
+
+    @staticmethod
+    def _add_totals(totals: np.ndarray, magnitude: float, phase: float, count: int):
+        """Add deltas to a row of aggregates with Neumaier compensated summation"""
+        for column, error_column, value in ((MAGNITUDE, MAGNITUDE_ERROR, magnitude), (PHASE, PHASE_ERROR, phase)):
+            total = float(totals[column])
+            result = total + value
+            if abs(total) >= abs(value):
+                totals[error_column] += (total - result) + value
+            else:
+                totals[error_column] += (value - result) + total
+            totals[column] = result
+        totals[COUNT] += count
+
+    def _accumulate(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray) -> np.ndarray:
+        """Scatter-add states and return the change to one row of aggregates"""
+        keys = np.unique(np.asarray(xs, dtype=np.int64) * self.grid_size + np.asarray(ys, dtype=np.int64))
+        cell_xs, cell_ys = keys // self.grid_size, keys % self.grid_size
+        old = self.get(cell_xs, cell_ys).astype(np.complex128)
+        self._scatter_add(xs, ys, states)
+        new = self.get(cell_xs, cell_ys).astype(np.complex128)
+        for observer in self.observers:
+            observer.cells_updated(cell_xs, cell_ys, old, new)
+        
+        return (
+            float(np.sum(np.abs(new) - np.abs(old))),
+            float(np.sum(np.angle(new) - np.angle(old))),
+            len(states)
+        )
+
+    def _accumulate_one(self, x: int, y: int, state: complex) -> tuple:
+        """Add a state to one cell and return the change to one row of aggregates"""
+        old, new = (complex(value) for value in self._add_one(x, y, state))
+        for observer in self.observers:
+            observer.cell_updated(x, y, old, new)
+        return abs(new) - abs(old), cmath.phase(new) - cmath.phase(old), 1
+
+    def _count_updates(self, count: int):
+        self._updates_since_recompute += count
+        if self.recompute_interval and self._updates_since_recompute >= self.recompute_interval:
+            self.recompute_aggregates()
+
+    def recompute_aggregates(self) -> float:
+        """Rebuild the running sums from the cells and return the drift corrected"""
+        values = self.values()
+        return self._reset_totals(self._totals[0], values)
+
+    def _reset_totals(self, totals: np.ndarray, values: np.ndarray) -> float:
+        magnitude_sum = float(np.sum(np.abs(values), dtype=np.float64))
+        phase_sum = float(np.sum(np.angle(values), dtype=np.float64))
+        drift = max(abs(magnitude_sum - totals[MAGNITUDE] - totals[MAGNITUDE_ERROR]),
+                    abs(phase_sum - totals[PHASE] - totals[PHASE_ERROR]))
+        
+        totals[MAGNITUDE] = magnitude_sum
+        totals[PHASE] = phase_sum
+        totals[MAGNITUDE_ERROR] = totals[PHASE_ERROR] = 0
+        self.max_drift = max(self.max_drift, drift)
+        self._updates_since_recompute = 0
+        return drift
+
+    def aggregate_totals(self) -> np.ndarray:
+        """Running (magnitude, phase, count) sums over all stripes, compensation applied"""
+        totals = self._totals.sum(axis=0)
+        return np.array([
+            totals[MAGNITUDE] + totals[MAGNITUDE_ERROR],
+            totals[PHASE] + totals[PHASE_ERROR],
+            totals[COUNT]
+        ])
+
+    def restore_aggregate_totals(self, totals: np.ndarray):
+        """Replace the running aggregates with values from aggregate_totals(), e.g. from a checkpoint"""
+        self._totals[:] = 0
+        self._totals[0, [MAGNITUDE, PHASE, COUNT]] = totals
+
+    def scale(self, factor: float):
+        """Multiply every cell by a positive factor; magnitude sums scale with it, phases do not change"""
+        self._scale_cells(factor)
+        self._totals[:, [MAGNITUDE, MAGNITUDE_ERROR]] *= factor
+        for observer in self.observers:
+            observer.scaled(factor)
+
+    def _scale_cells(self, factor: float):
+        raise NotImplementedError
+
+    def export_cells(self) -> np.ndarray:
+        """Cell data for a checkpoint, as a single array np.save can write"""
+        raise NotImplementedError
+
+    def import_cells(self, cells: np.ndarray):
+        """Load cell data written by export_cells, possibly memory-mapped"""
+        raise NotImplementedError
+
+    def _scatter_add(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray):
+        raise NotImplementedError
+
+    def _add_one(self, x: int, y: int, state: complex):
+        """Add a state to one cell and return its (old, new) values"""
+        raise NotImplementedError
+
+    def get(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Read cell values; cells never written read as zero"""
+        raise NotImplementedError
+
+    def values(self) -> np.ndarray:
+        """Stored cell values; cells left out of the array are zero"""
+        raise NotImplementedError
+
+    def to_dense(self) -> np.ndarray:
+        """Materialize the full grid as a dense array"""
+        raise NotImplementedError
+
+
+class DenseEnergyField(EnergyField):
+    """Energy field stored as a full grid_size x grid_size array"""
+
+    def __init__(self, grid_size: int = 1000, dtype=complex, recompute_interval: Optional[int] = None,
+                 rows: Optional[int] = None):
+        super().__init__(grid_size, dtype, recompute_interval, rows)
+        self.array = np.zeros((self.rows, grid_size), dtype=self.dtype)
+
+    @property
+    def occupied(self) -> int:
+        return int(np.count_nonzero(self.array))
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def _scatter_add(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray):
+        np.add.at(self.array, (xs, ys), states)
+
+    def _add_one(self, x: int, y: int, state: complex):
+        old = self.array[x, y]
+        self.array[x, y] = old + state
+        return old, self.array[x, y]
+
+    def get(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        return self.array[xs, ys]
+
+    def values(self) -> np.ndarray:
+        return self.array
+
+    def to_dense(self) -> np.ndarray:
+        return self.array.copy()
+
+    def _scale_cells(self, factor: float):
+        self.array *= factor
+
+    def export_cells(self) -> np.ndarray:
+        return self.array
+
+    def import_cells(self, cells: np.ndarray):
+        if cells.shape != self.array.shape or cells.dtype != self.dtype:
+            raise ValueError(f"Cannot load {cells.dtype} cells of shape {cells.shape} into {self.array.shape} field")
+        # A copy-on-write memory map is used as-is: pages are copied only when written
+        self.array = cells
+
+
+class SparseEnergyField(EnergyField):
+    """Energy field stored only for occupied cells
+
+    A coordinate-keyed hash map assigns each occupied cell a slot in a
+    contiguous value array, so memory grows with the number of occupied
+    cells rather than with the grid size, and reductions stay vectorized.
+    """
+
+    def __init__(self, grid_size: int = 1000, dtype=complex, recompute_interval: Optional[int] = None,
+                 rows: Optional[int] = None, initial_capacity: int = 1024):
+        super().__init__(grid_size, dtype, recompute_interval, rows)
+        self._slots: Dict[int, int] = {}
+        self._values = np.zeros(initial_capacity, dtype=self.dtype)
+
+    @property
+    def occupied(self) -> int:
+        return len(self._slots)
+
+    @property
+    def nbytes(self) -> int:
+        return self._values.nbytes
+
+    def _keys(self, xs: np.ndarray, ys: np.ndarray) -> list:
+        return (np.asarray(xs, dtype=np.int64) * self.grid_size + np.asarray(ys, dtype=np.int64)).tolist()
+
+    def _ensure_capacity(self, required: int):
+        capacity = len(self._values)
+        if required <= capacity:
+            return
+        while capacity < required:
+            capacity *= 2
+        values = np.zeros(capacity, dtype=self.dtype)
+        values[:len(self._values)] = self._values
+        self._values = values
+
+    def _scatter_add(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray):
+        slots = self._slots
+        # setdefault hands unseen cells the next free slot in arrival order
+        indices = [slots.setdefault(key, len(slots)) for key in self._keys(xs, ys)]
+        self._ensure_capacity(len(slots))
+        np.add.at(self._values, indices, states)
+
+    def _add_one(self, x: int, y: int, state: complex):
+        slots = self._slots
+        slot = slots.setdefault(x * self.grid_size + y, len(slots))
+        self._ensure_capacity(len(slots))
+        old = self._values[slot]
+        self._values[slot] = old + state
+        return old, self._values[slot]
+
+    def get(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        indices = np.array([self._slots.get(key, -1) for key in self._keys(xs, ys)], dtype=np.intp)
+        result = np.zeros(len(indices), dtype=self.dtype)
+        found = indices >= 0
+        result[found] = self._values[indices[found]]
+        return result
+
+    def values(self) -> np.ndarray:
+        return self._values[:len(self._slots)]
+
+    def to_dense(self) -> np.ndarray:
+        dense = np.zeros((self.rows, self.grid_size), dtype=self.dtype)
+        if self._slots:
+            keys = np.fromiter(self._slots.keys(), dtype=np.int64, count=len(self._slots))
+            slots = np.fromiter(self._slots.values(), dtype=np.intp, count=len(self._slots))
+            dense[keys // self.grid_size, keys % self.grid_size] = self._values[slots]
+        return dense
+
+    def _scale_cells(self, factor: float):
+        self._values *= factor
+
+    def export_cells(self) -> np.ndarray:
+        cells = np.zeros(len(self._slots), dtype=[('key', '<i8'), ('value', self.dtype)])
+        if self._slots:
+            cells['key'] = np.fromiter(self._slots.keys(), dtype=np.int64, count=len(self._slots))
+            cells['value'] = self._values[np.fromiter(self._slots.values(), dtype=np.intp, count=len(self._slots))]
+        return cells
+
+    def import_cells(self, cells: np.ndarray):
+        self._slots = {key: slot for slot, key in enumerate(cells['key'].tolist())}
+        self._values = np.zeros(max(len(cells), 1024), dtype=self.dtype)
+        self._values[:len(cells)] = cells['value']
+
+
+def default_shared_field_path() -> str:
+    """Location of the shared field file, on tmpfs when available"""
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, 'quantum-energy-field')
+
+
+class SharedEnergyField(EnergyField):
+    """Dense energy field shared by every process that maps the same file
+
+    The grid and the running aggregates live in one memory-mapped file
+    (on /dev/shm by default), so all uvicorn workers update and read a
+    single coherent field. Rows are split into lock stripes by x modulo
+    the stripe count; each stripe has its own row of aggregates and its own
+    byte-range lock on a companion .lock file, so workers only contend
+    when they touch the same stripe. The file is created by whichever
+    process gets there first and left in place for the others; call
+    unlink() to remove it.
+    """
+
+    MAGIC = b'QFEFLD02'
+    META_DTYPE = np.dtype([('magic', 'S8'), ('grid_size', '<i8'), ('stripes', '<i8'), ('dtype', 'S16')])
+    PAGE_SIZE = 4096
+
+    def __init__(self, grid_size: int = 1000, dtype=complex, recompute_interval: Optional[int] = None,
+                 path: Optional[str] = None, stripes: int = 16):
+        super().__init__(grid_size, dtype, recompute_interval)
+        self.path = path or default_shared_field_path()
+        self.stripes = stripes
+        self._thread_locks = [threading.Lock() for _ in range(stripes)]
+        self._lock_file = open(self.path + '.lock', 'a+b')
+
+        totals_offset = self.META_DTYPE.itemsize
+        field_offset = -(-(totals_offset + stripes * AGGREGATE_COLUMNS * 8) // self.PAGE_SIZE) * self.PAGE_SIZE
+        file_size = field_offset + grid_size * grid_size * self.dtype.itemsize
+
+        # Stripe locks occupy bytes [0, stripes) of the lock file; byte `stripes` guards creation
+        with self._file_lock(stripes):
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    os.ftruncate(fd, file_size)
+                    meta = np.memmap(self.path, dtype=self.META_DTYPE, mode='r+', shape=(1,))
+                    meta[0] = (self.MAGIC, grid_size, stripes, self.dtype.str.encode())
+                    meta.flush()
+            finally:
+                os.close(fd)
+
+            meta = np.memmap(self.path, dtype=self.META_DTYPE, mode='r', shape=(1,))[0]
+            expected = (self.MAGIC, grid_size, stripes, self.dtype.str.encode())
+            if tuple(meta) != expected or os.path.getsize(self.path) != file_size:
+                raise ValueError(f"Shared field at {self.path} does not match grid_size={grid_size}, "
+                                 f"stripes={stripes}, dtype={self.dtype}")
+
+        self._totals = np.memmap(self.path, dtype=np.float64, mode='r+', offset=totals_offset,
+                                 shape=(stripes, AGGREGATE_COLUMNS))
+        self.array = np.memmap(self.path, dtype=self.dtype, mode='r+', offset=field_offset,
+                               shape=(grid_size, grid_size))
+
+    @contextmanager
+    def _file_lock(self, index: int) -> Iterator[None]:
+        fcntl.lockf(self._lock_file, fcntl.LOCK_EX, 1, index)
+        try:
+            yield
+        finally:
+            fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, index)
+
+    @contextmanager
+    def _stripe_lock(self, stripe: int) -> Iterator[None]:
+        # Record locks are per process, so threads of one worker also need a local lock
+        with self._thread_locks[stripe], self._file_lock(stripe):
+            yield
+
+    @property
+    def occupied(self) -> int:
+        return int(np.count_nonzero(self.array))
+
+    @property
+    def nbytes(self) -> int:
+        return self.array.nbytes
+
+    def add(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray):
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        stripe_of = xs % self.stripes
+        for stripe in np.unique(stripe_of).tolist():
+            mask = stripe_of == stripe
+            with self._stripe_lock(stripe):
+                self._add_totals(self._totals[stripe], *self._accumulate(xs[mask], ys[mask], states[mask]))
+        self._count_updates(len(states))
+
+    def add_one(self, x: int, y: int, state: complex):
+        stripe = x % self.stripes
+        with self._stripe_lock(stripe):
+            self._add_totals(self._totals[stripe], *self._accumulate_one(x, y, state))
+        self._count_updates(1)
+
+    def recompute_aggregates(self) -> float:
+        drift = 0.0
+        for stripe in range(self.stripes):
+            with self._stripe_lock(stripe):
+                drift = max(drift, self._reset_totals(self._totals[stripe], self.array[stripe::self.stripes]))
+        return drift
+
+    def _scatter_add(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray):
+        np.add.at(self.array, (xs, ys), states)
+
+    def _add_one(self, x: int, y: int, state: complex):
+        old = self.array[x, y]
+        self.array[x, y] = old + state
+        return old, self.array[x, y]
+
+    def get(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        return self.array[xs, ys]
+
+    def values(self) -> np.ndarray:
+        return self.array
+
+    def to_dense(self) -> np.ndarray:
+        return np.array(self.array)
+
+    def scale(self, factor: float):
+        raise NotImplementedError("Workers cannot agree on a decay frame for the shared field")
+
+    def export_cells(self) -> np.ndarray:
+        raise NotImplementedError("The shared field outlives worker restarts on its own; checkpoint a dense field")
+
+    def import_cells(self, cells: np.ndarray):
+        raise NotImplementedError("The shared field outlives worker restarts on its own; checkpoint a dense field")
+
+    def flush(self):
+        """Write dirty pages back to the file (only needed for disk-backed paths)"""
+        self.array.flush()
+        self._totals.flush()
+
+    def unlink(self):
+        """Remove the shared field files; processes that mapped them keep their mappings"""
+        for path in (self.path, self.path + '.lock'):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _run_shard(connection, backend: str, grid_size: int, rows: int, dtype, recompute_interval: Optional[int]):
+    """Serve one column band of a sharded field from a worker process, stored transposed as rows"""
+    field = create_energy_field(backend, grid_size, dtype=dtype, recompute_interval=recompute_interval, rows=rows)
+    while True:
+        command, args = connection.recv()
+        if command == 'add':
+            # Adds are not acknowledged; later requests on the pipe are answered after them
+            field.add(*args)
+        elif command == 'close':
+            connection.close()
+            return
+        else:
+            attribute = getattr(field, command)
+            connection.send(attribute(*args) if callable(attribute) else attribute)
+
+
+class ShardedEnergyField(EnergyField):
+    """Energy field partitioned into column bands owned by separate worker processes
+
+    Each shard process stores a contiguous band of columns in its own dense
+    or sparse field, transposed so the band is the shard's rows, and keeps
+    the aggregates for that band. Columns come from the stable hash of the
+    transaction id and spread evenly, while rows come from the energy and
+    cluster in a narrow range. Batches are routed by column, sent to every
+    shard they touch without waiting for a reply, and applied by the shards
+    in parallel; reads ask every shard and merge the answers. Nothing is
+    shared between shards, so there is no lock contention between them; one
+    local lock keeps requests from different threads from interleaving on
+    the pipes. Call close() to stop the shard processes.
+    """
+
+    def __init__(self, grid_size: int = 1000, dtype=complex, recompute_interval: Optional[int] = None,
+                 shards: int = 4, shard_backend: str = 'dense'):
+        super().__init__(grid_size, dtype, recompute_interval)
+        self.band = -(-grid_size // shards)
+        self.shards = -(-grid_size // self.band)
+        context = multiprocessing.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        # Replies are matched to requests by order, so a request's sends and receives must not interleave
+        self._pipe_lock = threading.Lock()
+        for shard in range(self.shards):
+            rows = min(self.band, grid_size - shard * self.band)
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_run_shard,
+                args=(child, shard_backend, grid_size, rows, self.dtype, recompute_interval),
+                daemon=True
+            )
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    def _request(self, command: str, *args) -> list:
+        with self._pipe_lock:
+            for connection in self._connections:
+                connection.send((command, args))
+            return [connection.recv() for connection in self._connections]
+
+    def _route(self, ys: np.ndarray) -> Iterator:
+        """Yield (shard, mask) for every shard owning some of the given columns"""
+        owners = np.asarray(ys, dtype=np.int64) // self.band
+        for shard in np.unique(owners).tolist():
+            yield shard, owners == shard
+
+    @property
+    def occupied(self) -> int:
+        return sum(self._request('occupied'))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self._request('nbytes'))
+
+    def aggregate_totals(self) -> np.ndarray:
+        return np.sum(self._request('aggregate_totals'), axis=0)
+
+    def add(self, xs: np.ndarray, ys: np.ndarray, states: np.ndarray):
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        states = np.asarray(states)
+        with self._pipe_lock:
+            for shard, mask in self._route(ys):
+                self._connections[shard].send(('add', (ys[mask] - shard * self.band, xs[mask], states[mask])))
+
+    def add_one(self, x: int, y: int, state: complex):
+        shard = y // self.band
+        update = (np.array([y - shard * self.band]), np.array([x]), np.array([state]))
+        with self._pipe_lock:
+            self._connections[shard].send(('add', update))
+
+    def get(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        result = np.zeros(len(xs), dtype=self.dtype)
+        routed = list(self._route(ys))
+        with self._pipe_lock:
+            for shard, mask in routed:
+                self._connections[shard].send(('get', (ys[mask] - shard * self.band, xs[mask])))
+            for shard, mask in routed:
+                result[mask] = self._connections[shard].recv()
+        return result
+
+    def recompute_aggregates(self) -> float:
+        drift = max(self._request('recompute_aggregates'))
+        self.max_drift = max(self.max_drift, drift)
+        return drift
+
+    def values(self) -> np.ndarray:
+        return np.concatenate([np.ravel(values) for values in self._request('values')])
+
+    def to_dense(self) -> np.ndarray:
+        return np.concatenate(self._request('to_dense')).T.copy()
+
+    def scale(self, factor: float):
+        self._request('scale', factor)
+
+    def export_cells(self) -> np.ndarray:
+        raise NotImplementedError("Sharded fields are not checkpointed")
+
+    def import_cells(self, cells: np.ndarray):
+        raise NotImplementedError("Sharded fields are not checkpointed")
+
+    def close(self):
+        """Stop the shard processes"""
+        with self._pipe_lock:
+            for connection in self._connections:
+                connection.send(('close', ()))
+                connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+
+FIELD_BACKENDS: Dict[str, Type[EnergyField]] = {
+    'dense': DenseEnergyField,
+    'sparse': SparseEnergyField,
+    'shared': SharedEnergyField,
+    'sharded': ShardedEnergyField
+}
+
+
+def create_energy_field(backend: str = 'dense', grid_size: int = 1000, **kwargs) -> EnergyField:
+    """Create an energy field for the named storage backend"""
+    if backend not in FIELD_BACKENDS:
+        raise ValueError(f"Unknown energy field backend: {backend}")
+    return FIELD_BACKENDS[backend](grid_size, **kwargs)
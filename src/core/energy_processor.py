@@ -1,17 +1,96 @@
 import numpy as np
 import math
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 import asyncio
+import os
+import threading
+
+from .energy_field import COUNT, MAGNITUDE, PHASE, create_energy_field
+from .hashing import stable_hash, stable_hash_array
+from .idempotency_cache import IdempotencyCache
+from .intent_classifier import IntentClassifier
+from .metrics import metrics
+from .persistence import WAL_DTYPE, FieldPersistence
+from .region_index import RegionIndex
+from .transaction_history import TransactionHistory
+
+def _finite_number(value: Any) -> bool:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        # Integers too large for a float
+        return False
 
 class QuantumFinancialEnergyProcessor:
     """Core processor for financial energy transformation"""
     
-    def __init__(self):
-        self.energy_field = np.zeros((1000, 1000), dtype=complex)
-        self.transaction_history = []
+    # With half_life set, contributions decay exponentially with age. The field
+    # is stored in a frame normalized to a decay epoch: new states are scaled up
+    # by their growth since the epoch and reads scale aggregates back down, so
+    # no update or snapshot sweeps the grid. The field is renormalized to a new
+    # epoch once stored values have grown by e**20 (about 5e8).
+    DECAY_RENORMALIZE_EXPONENT = 20.0
+    
+    def __init__(self, grid_size: int = 1000, field_backend: str = 'dense',
+                 aggregate_recompute_interval: Optional[int] = None, field_options: Optional[Dict] = None,
+                 history_size: int = 100_000, history_spill_path: Optional[str] = None,
+                 intent_weights: Optional[Dict[str, float]] = None, intent_cache_size: int = 4096,
+                 persistence_dir: Optional[str] = None, checkpoint_interval: int = 100_000,
+                 half_life: Optional[float] = None, region_index: bool = False, field_dtype='complex128',
+                 idempotency_cache_size: int = 100_000, idempotency_ttl: float = 3600.0,
+                 idempotency_path: Optional[str] = None):
+        if persistence_dir and field_backend in ('shared', 'sharded'):
+            # Checked before the field is created, so no shard processes or shared files are left behind
+            raise ValueError(f"Checkpoints are not supported with the {field_backend} field backend")
+        self.grid_size = grid_size
+        # Serializes field, history and log updates when batches run on worker threads
+        self._lock = threading.RLock()
+        # Bumped on every field update and resonance config change, for response caching
+        self.field_version = 0
+        self.resonance_version = 0
+        self.energy_field = create_energy_field(
+            field_backend, grid_size, dtype=field_dtype, recompute_interval=aggregate_recompute_interval,
+            **(field_options or {})
+        )
+        # History energies use the real dtype matching the field precision
+        energy_dtype = np.zeros(1, dtype=field_dtype).real.dtype
+        self.transaction_history = TransactionHistory(history_size, history_spill_path, energy_dtype)
+        self.checkpoint_interval = checkpoint_interval
+        if half_life and field_backend == 'shared':
+            raise ValueError("Energy decay is not supported with the shared field backend")
+        self.half_life = half_life
+        self._decay_rate = math.log(2) / half_life if half_life else 0.0
+        self._decay_epoch = datetime.now().timestamp()
+        self._decay_generation = 0
+        self.persistence = None
+        if persistence_dir:
+            self.persistence = FieldPersistence(persistence_dir)
+            self.persistence.recover(self.energy_field, self.transaction_history)
+            if self._decay_rate:
+                # Logged states are stored relative to the decay epoch of the checkpoint before them
+                if 'decay_epoch' in self.persistence.metadata:
+                    self._decay_epoch = self.persistence.metadata['decay_epoch']
+                else:
+                    self.checkpoint()
+        self.region_index = None
+        if region_index:
+            if field_backend in ('shared', 'sharded'):
+                raise ValueError(f"The region index cannot observe updates to a {field_backend} field")
+            self.region_index = RegionIndex.for_field(self.energy_field)
+        self.intent_classifier = IntentClassifier(intent_weights, cache_size=intent_cache_size)
+        self.idempotency_cache = None
+        if idempotency_cache_size:
+            self.idempotency_cache = IdempotencyCache(idempotency_cache_size, idempotency_ttl, idempotency_path)
         self.network_resonances = self._initialize_network_resonances()
+        self._rebuild_resonance_table()
         self.constructive_threshold = 0.85
+        self.batching_strategies: Dict[str, Callable[[Iterable[Dict]], Iterable[List[Dict]]]] = {
+            'sequential': self.iter_batches,
+            'energy_gap': self.batch_by_energy_gaps
+        }
         
     def _initialize_network_resonances(self) -> Dict[str, Dict]:
         """Initialize resonance patterns for supported networks"""
@@ -24,25 +103,141 @@ class QuantumFinancialEnergyProcessor:
     
     async def process_transaction(self, transaction: Dict, network: str) -> Dict:
         """Process a transaction through the energy system"""
-        # Dimensional reduction
-        energy_signature = self._dimensional_reduction(transaction)
+        # Held across lookup and update so concurrent retries of one id are applied once
+        with self._lock:
+            # A retried transaction gets its earlier result and leaves the field untouched
+            key = None
+            if self.idempotency_cache is not None and 'id' in transaction:
+                key = self.idempotency_cache.key(transaction)
+                cached = self.idempotency_cache.get(key)
+                if cached is not None:
+                    return dict(cached)
+            
+            # Dimensional reduction
+            with metrics.stage('dimensional_reduction', network):
+                energy_signature = self._dimensional_reduction(transaction)
+            
+            # Resonance optimization
+            with metrics.stage('resonance_timing', network):
+                optimal_time = self._calculate_resonance_timing(network)
+            
+            # Quantum state creation
+            with metrics.stage('quantum_state', network):
+                quantum_state = self._create_quantum_state(energy_signature)
+            
+            result = {
+                'energy_signature': energy_signature,
+                'optimal_execution': optimal_time,
+                'quantum_state': quantum_state,
+                'network': network,
+                'processed_at': datetime.now().isoformat()
+            }
+            if key is not None:
+                # Claimed before the update, so a worker process retrying the same id applies it once
+                cached = self.idempotency_cache.claim_many([(key, result)])[0]
+                if cached is not None:
+                    return dict(cached)
+                result = dict(result)
+            
+            # Update energy field
+            with metrics.stage('update_energy_field', network):
+                self._update_energy_field(transaction, energy_signature, quantum_state)
+            metrics.count_transactions(1, network)
+            return result
+    
+    def process_batch(self, transactions: List[Dict], network: str) -> List[Dict]:
+        """Process a batch of transactions through the energy system in one vectorized pass
         
-        # Resonance optimization
-        optimal_time = self._calculate_resonance_timing(network)
+        With the idempotency cache enabled, transactions already processed
+        (and repeats within the batch) get their earlier result and only the
+        rest reach the energy field.
+        """
+        if not transactions:
+            return []
+        if self.idempotency_cache is None:
+            return self._process_batch(transactions, network)
         
-        # Quantum state creation
-        quantum_state = self._create_quantum_state(energy_signature)
+        keys = [self.idempotency_cache.key(t) if 'id' in t else None for t in transactions]
+        results: List[Optional[Dict]] = [None] * len(transactions)
+        first_index: Dict[str, int] = {}
+        misses = []
+        for index, key in enumerate(keys):
+            if key is not None:
+                if key in first_index:
+                    continue
+                cached = self.idempotency_cache.get(key)
+                if cached is not None:
+                    results[index] = cached
+                    continue
+                first_index[key] = index
+            misses.append(index)
         
-        # Update energy field
-        self._update_energy_field(transaction, energy_signature, quantum_state)
+        def claim(processed: List[Dict]) -> np.ndarray:
+            # Runs under the lock with the field update: ids another batch or worker process
+            # applied since the lookup above take its result, and the rest are claimed first
+            apply = np.ones(len(misses), dtype=bool)
+            positions = [position for position, index in enumerate(misses) if keys[index] is not None]
+            earlier = self.idempotency_cache.claim_many(
+                (keys[misses[position]], processed[position]) for position in positions
+            )
+            for position, cached in zip(positions, earlier):
+                if cached is not None:
+                    apply[position] = False
+                    results[misses[position]] = cached
+            return apply
         
-        return {
-            'energy_signature': energy_signature,
-            'optimal_execution': optimal_time,
-            'quantum_state': quantum_state,
-            'network': network,
-            'processed_at': datetime.now().isoformat()
-        }
+        if misses:
+            processed = self._process_batch([transactions[index] for index in misses], network, claim)
+            for index, result in zip(misses, processed):
+                if results[index] is None:
+                    results[index] = result
+        
+        return [dict(result if result is not None else results[first_index[key]])
+                for result, key in zip(results, keys)]
+    
+    def _process_batch(self, transactions: List[Dict], network: str,
+                       claim: Optional[Callable[[List[Dict]], np.ndarray]] = None) -> List[Dict]:
+        with metrics.stage('dimensional_reduction', network, 'batch'):
+            energy_signatures = self._dimensional_reduction_batch(transactions)
+        with metrics.stage('resonance_timing', network, 'batch'):
+            optimal_time = self._calculate_resonance_timing(network)
+        with metrics.stage('quantum_state', network, 'batch'):
+            quantum_states = self._create_quantum_states(energy_signatures)
+        
+        processed_at = datetime.now().isoformat()
+        results = [
+            {
+                'energy_signature': energy_signature,
+                'optimal_execution': optimal_time,
+                'quantum_state': quantum_state,
+                'network': network,
+                'processed_at': processed_at
+            }
+            for energy_signature, quantum_state in zip(energy_signatures.tolist(), quantum_states)
+        ]
+        with metrics.stage('update_energy_field', network, 'batch'):
+            applied = self._update_energy_field_batch(
+                transactions, energy_signatures, quantum_states, claim and (lambda: claim(results))
+            )
+        metrics.count_transactions(applied, network)
+        return results
+    
+    @staticmethod
+    def check_transaction(transaction: Dict):
+        """Raise ValueError if a transaction's fields cannot be reduced to an energy
+        
+        Lets streams and jobs skip one bad record instead of failing the
+        whole batch it would be processed in.
+        """
+        if not _finite_number(transaction.get('amount')):
+            raise ValueError("Transaction amount must be a number")
+        if not transaction['amount'] > -1:
+            raise ValueError("Transaction amount must be greater than -1")
+        if not _finite_number(transaction.get('time_priority', 0.5)):
+            raise ValueError("Transaction time_priority must be a number")
+        purpose = transaction.get('purpose')
+        if purpose and not isinstance(purpose, str):
+            raise ValueError("Transaction purpose must be a string")
     
     def _dimensional_reduction(self, transaction: Dict) -> float:
         """Reduce transaction to fundamental energy"""
@@ -52,91 +247,315 @@ class QuantumFinancialEnergyProcessor:
         
         return base_energy + time_energy + intent_energy
     
+    def _dimensional_reduction_batch(self, transactions: List[Dict]) -> np.ndarray:
+        """Reduce a batch of transactions to their fundamental energies"""
+        # math.log is kept per amount: np.log can differ from it in the last ulp,
+        # and batch results must match the scalar path bit for bit
+        base_energy = np.array([math.log(t['amount'] + 1) for t in transactions]) * 0.01
+        time_energy = np.array([t.get('time_priority', 0.5) for t in transactions], dtype=float) * 0.1
+        intent_energy = np.array([self._calculate_intent_energy(t.get('purpose', '')) for t in transactions])
+        
+        return base_energy + time_energy + intent_energy
+    
     def _calculate_intent_energy(self, purpose: str) -> float:
         """Calculate energy based on transaction purpose"""
-        if not purpose:
-            return 0.5
+        return self.intent_classifier.score(purpose)
+    
+    def configure_intent_keywords(self, weights: Dict[str, float], **options):
+        """Replace the purpose keywords and their score weights, recompiling the matcher"""
+        options.setdefault('cache_size', self.intent_classifier.score.cache_info().maxsize)
+        self.intent_classifier = IntentClassifier(weights, **options)
+    
+    def _rebuild_resonance_table(self):
+        """Precompute per-network peak offsets and periods from the resonance config"""
+        time_to_peak = {}
+        for network, resonance in self.network_resonances.items():
+            frequency = resonance['frequency']
+            phase = resonance['phase']
             
-        positive_words = ['payment', 'transfer', 'donation', 'investment', 'exchange']
-        negative_words = ['fee', 'penalty', 'withdrawal', 'settlement']
-        
-        score = 0
-        for word in positive_words:
-            if word in purpose.lower():
-                score -= 0.1
-        for word in negative_words:
-            if word in purpose.lower():
-                score += 0.1
-                
-        return max(0.1, min(1.0, 0.5 + score))
-    
-    def _calculate_resonance_timing(self, network: str) -> datetime:
+            offset = ((math.pi/2 - phase) % (2*math.pi)) / (2 * math.pi * frequency)
+            if offset < 0:
+                offset += 1/frequency
+            time_to_peak[network] = offset
+        
+        self._time_to_peak = time_to_peak
+        self._resonance_networks = list(self.network_resonances)
+        self._resonance_index = {network: i for i, network in enumerate(self._resonance_networks)}
+        self._resonance_offsets = np.array([time_to_peak[n] for n in self._resonance_networks], dtype=float)
+        self._resonance_periods = np.array(
+            [1 / self.network_resonances[n]['frequency'] for n in self._resonance_networks], dtype=float
+        )
+        self.resonance_version += 1
+    
+    def set_network_resonance(self, network: str, frequency: float, amplitude: float, phase: float):
+        """Add or update a network's resonance pattern"""
+        if frequency <= 0:
+            raise ValueError("Resonance frequency must be positive")
+        self.network_resonances[network] = {'frequency': frequency, 'amplitude': amplitude, 'phase': phase}
+        self._rebuild_resonance_table()
+    
+    def remove_network_resonance(self, network: str):
+        """Stop supporting a network"""
+        del self.network_resonances[network]
+        self._rebuild_resonance_table()
+    
+    def _calculate_resonance_timing(self, network: str, now: Optional[datetime] = None) -> datetime:
         """Calculate optimal execution time based on network resonance"""
-        resonance = self.network_resonances[network]
-        t = datetime.now().timestamp()
+        time_to_peak = self._time_to_peak[network]
+        return (now or datetime.now()) + timedelta(seconds=time_to_peak)
+    
+    def resonance_schedule(self, peaks: int = 5, networks: Optional[List[str]] = None,
+                           now: Optional[datetime] = None) -> Dict[str, List[datetime]]:
+        """Next resonance peaks for each network, computed for all networks at once"""
+        names = self._resonance_networks if networks is None else list(networks)
+        indices = [self._resonance_index[network] for network in names]
+        now = now or datetime.now()
         
-        frequency = resonance['frequency']
-        phase = resonance['phase']
+        # Peak k of a network falls k periods after its first peak
+        seconds = (self._resonance_offsets[indices, None]
+                   + self._resonance_periods[indices, None] * np.arange(peaks))
+        times = np.datetime64(now, 'us') + np.round(seconds * 1e6).astype('timedelta64[us]')
         
-        time_to_peak = ((math.pi/2 - phase) % (2*math.pi)) / (2 * math.pi * frequency)
-        if time_to_peak < 0:
-            time_to_peak += 1/frequency
-            
-        return datetime.now() + timedelta(seconds=time_to_peak)
+        return dict(zip(names, times.tolist()))
     
     def _create_quantum_state(self, energy: float) -> complex:
         """Create quantum state representation"""
         phase = energy * 2 * math.pi
         return np.exp(1j * phase) * energy
     
+    def _create_quantum_states(self, energies: np.ndarray) -> np.ndarray:
+        """Create quantum state representations for an array of energies"""
+        phases = energies * 2 * math.pi
+        return np.exp(1j * phases) * energies
+    
     def _update_energy_field(self, transaction: Dict, energy: float, state: complex):
         """Update the quantum energy field"""
-        x = int(energy * 100) % 1000
-        y = int(hash(transaction.get('id', str(energy))) % 1000)
+        x = int(energy * 100) % self.grid_size
+        y = stable_hash(transaction.get('id', str(energy))) % self.grid_size
         
-        self.energy_field[x, y] += state
-        self.transaction_history.append({
-            'transaction': transaction,
-            'energy': energy,
-            'coordinates': (x, y),
-            'timestamp': datetime.now()
-        })
+        with self._lock:
+            timestamp = datetime.now().timestamp()
+            state = state * self._decay_growth(timestamp)
+            self.energy_field.add_one(x, y, state)
+            self.field_version += 1
+            self.transaction_history.append(energy, x, y, timestamp, transaction.get('id', ''))
+            if self.persistence is not None:
+                self.persistence.log(x, y, state, energy, timestamp)
+                self._maybe_checkpoint()
+    
+    def _update_energy_field_batch(self, transactions: List[Dict], energies: np.ndarray, states: np.ndarray,
+                                   claim: Optional[Callable[[], np.ndarray]] = None) -> int:
+        """Apply a batch of quantum states to the energy field in one scatter-add
+        
+        Coordinates and history records are built before the processor lock
+        is taken. claim, when given, is called under the lock and returns the
+        mask of transactions still to apply. Returns the number applied.
+        """
+        xs = (energies * 100).astype(np.int64) % self.grid_size
+        ids = [transaction.get('id', str(energy)) for transaction, energy in zip(transactions, energies.tolist())]
+        ys = (stable_hash_array(ids) % np.uint64(self.grid_size)).astype(np.int64)
+        records = np.empty(len(transactions), dtype=self.transaction_history.dtype)
+        records['energy'] = energies
+        records['x'] = xs
+        records['y'] = ys
+        records['transaction_id'] = [str(transaction.get('id', '')).encode() for transaction in transactions]
+        
+        with self._lock:
+            if claim is not None:
+                apply = claim()
+                if not apply.all():
+                    xs, ys, states = xs[apply], ys[apply], states[apply]
+                    energies, records = energies[apply], records[apply]
+                if not len(records):
+                    return 0
+            timestamp = datetime.now().timestamp()
+            if self._decay_rate:
+                states = states * self._decay_growth(timestamp)
+            
+            # np.add.at accumulates repeated coordinates in order, like sequential updates
+            self.energy_field.add(xs, ys, states)
+            self.field_version += 1
+            
+            records['timestamp'] = timestamp
+            self.transaction_history.extend(records)
+            
+            if self.persistence is not None:
+                log_records = np.empty(len(records), dtype=WAL_DTYPE)
+                log_records['x'] = xs
+                log_records['y'] = ys
+                log_records['state'] = states
+                log_records['energy'] = energies
+                log_records['timestamp'] = timestamp
+                self.persistence.log_batch(log_records)
+                self._maybe_checkpoint()
+        return len(records)
+    
+    def _decay_growth(self, timestamp: float) -> float:
+        """Factor mapping a state added at timestamp into the stored decay frame"""
+        if not self._decay_rate:
+            return 1.0
+        exponent = self._decay_rate * (timestamp - self._decay_epoch)
+        if exponent > self.DECAY_RENORMALIZE_EXPONENT:
+            # Odd while the frame changes, so lock-free snapshot reads can tell they overlapped it
+            self._decay_generation += 1
+            self.energy_field.scale(math.exp(-exponent))
+            self.field_version += 1
+            self._decay_epoch = timestamp
+            self._decay_generation += 1
+            exponent = 0.0
+            if self.persistence is not None:
+                self.checkpoint()
+        return math.exp(exponent)
+    
+    def _decay_factor(self, timestamp: Optional[float] = None) -> float:
+        """Factor mapping stored field values to their decayed value at timestamp"""
+        if not self._decay_rate:
+            return 1.0
+        if timestamp is None:
+            timestamp = datetime.now().timestamp()
+        return math.exp(-self._decay_rate * (timestamp - self._decay_epoch))
+    
+    def _maybe_checkpoint(self):
+        if self.persistence.logged_since_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+    
+    def checkpoint(self):
+        """Snapshot the field and history so a restart only replays updates logged after now"""
+        if self.persistence is None:
+            raise RuntimeError("Persistence is not enabled for this processor")
+        with self._lock:
+            metadata = {'decay_epoch': self._decay_epoch} if self._decay_rate else None
+            self.persistence.checkpoint(self.energy_field, self.transaction_history, metadata)
+    
+    def close(self):
+        """Commit the write-ahead log and close the on-disk stores, e.g. on shutdown"""
+        with self._lock:
+            if self.persistence is not None:
+                self.persistence.close()
+            self.transaction_history.close()
+            if self.idempotency_cache is not None:
+                self.idempotency_cache.close()
     
     def get_energy_snapshot(self):
         """Get snapshot of energy field for API response"""
+        # Read from the field's running aggregates; unoccupied cells are zero
+        # but still count towards the means over the full grid. The processor
+        # lock is not taken, so callers on the event loop never wait for a
+        # batch; only a read overlapping a decay renormalization is repeated under it.
+        with metrics.stage('energy_snapshot'):
+            generation = self._decay_generation
+            totals = self.energy_field.aggregate_totals()
+            magnitude_sum = totals[MAGNITUDE] * self._decay_factor()
+            if generation % 2 or generation != self._decay_generation:
+                with self._lock:
+                    totals = self.energy_field.aggregate_totals()
+                    magnitude_sum = totals[MAGNITUDE] * self._decay_factor()
+        size = self.energy_field.size
         return {
-            "magnitude_mean": float(np.mean(np.abs(self.energy_field))),
-            "phase_mean": float(np.mean(np.angle(self.energy_field))),
-            "energy_sum": float(np.sum(np.abs(self.energy_field))),
-            "transaction_count": len(self.transaction_history)
+            "magnitude_mean": float(magnitude_sum / size),
+            "phase_mean": float(totals[PHASE] / size),
+            "energy_sum": float(magnitude_sum),
+            "transaction_count": int(totals[COUNT])
         }
     
-    def batch_transactions(self, transactions: List[Dict]) -> List[List[Dict]]:
+    def region_snapshot(self, x_min: int, x_max: int, y_min: int, y_max: int) -> Dict:
+        """Energy statistics over an inclusive rectangle of the energy field"""
+        if self.region_index is None:
+            raise RuntimeError("The region index is not enabled for this processor")
+        with self._lock:
+            energy_sum, net_state = self.region_index.query(x_min, x_max, y_min, y_max)
+            decay = self._decay_factor()
+        cells = (x_max - x_min + 1) * (y_max - y_min + 1)
+        return {
+            "energy_sum": energy_sum * decay,
+            "magnitude_mean": energy_sum * decay / cells,
+            "net_magnitude": abs(net_state) * decay,
+            "net_phase": math.atan2(net_state.imag, net_state.real),
+            "cells": cells
+        }
+    
+    def batch_transactions(self, transactions: Iterable[Dict], strategy: str = 'sequential') -> List[List[Dict]]:
         """Batch transactions for constructive interference"""
-        batched = []
+        if strategy not in self.batching_strategies:
+            raise ValueError(f"Unknown batching strategy: {strategy}")
+        return list(self.batching_strategies[strategy](transactions))
+    
+    def iter_batches(self, transactions: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """Group consecutive transactions in a single pass, yielding each batch as it closes"""
         current_batch = []
         current_energy = None
+        energy_total = 0.0
         
         for transaction in transactions:
             energy = self._dimensional_reduction(transaction)
             
-            if current_energy is None:
-                current_energy = energy
+            if current_batch and abs(current_energy - energy) < self.constructive_threshold:
                 current_batch.append(transaction)
+                energy_total += energy
+                current_energy = energy_total / len(current_batch)
             else:
-                energy_diff = abs(current_energy - energy)
-                if energy_diff < self.constructive_threshold:
-                    current_batch.append(transaction)
-                    current_energy = sum(self._dimensional_reduction(t) for t in current_batch) / len(current_batch)
-                else:
-                    batched.append(current_batch)
-                    current_batch = [transaction]
-                    current_energy = energy
+                if current_batch:
+                    yield current_batch
+                current_batch = [transaction]
+                current_energy = energy_total = energy
         
         if current_batch:
-            batched.append(current_batch)
-            
-        return batched
+            yield current_batch
+    
+    def batch_by_energy_gaps(self, transactions: Iterable[Dict]) -> List[List[Dict]]:
+        """Cluster transactions by sorting on energy and splitting wherever neighbours differ by the threshold"""
+        transactions = list(transactions)
+        if not transactions:
+            return []
+        
+        energies = self._dimensional_reduction_batch(transactions)
+        order = np.argsort(energies, kind='stable')
+        splits = np.flatnonzero(np.diff(energies[order]) >= self.constructive_threshold) + 1
+        
+        return [[transactions[i] for i in group] for group in np.split(order, splits)]
+
+def create_processor_from_env() -> QuantumFinancialEnergyProcessor:
+    """Build a processor configured through ENERGY_* environment variables"""
+    field_backend = os.environ.get('ENERGY_FIELD_BACKEND', 'dense')
+    field_options = {}
+    if field_backend == 'shared':
+        field_options['path'] = os.environ.get('ENERGY_FIELD_PATH') or None
+        field_options['stripes'] = int(os.environ.get('ENERGY_FIELD_STRIPES', 16))
+    elif field_backend == 'sharded':
+        field_options['shards'] = int(os.environ.get('ENERGY_FIELD_SHARDS', 4))
+        field_options['shard_backend'] = os.environ.get('ENERGY_FIELD_SHARD_BACKEND', 'dense')
+    
+    return QuantumFinancialEnergyProcessor(
+        grid_size=int(os.environ.get('ENERGY_GRID_SIZE', 1000)),
+        field_backend=field_backend,
+        aggregate_recompute_interval=int(os.environ.get('ENERGY_AGGREGATE_RECOMPUTE_INTERVAL', 0)) or None,
+        field_options=field_options,
+        history_size=int(os.environ.get('ENERGY_HISTORY_SIZE', 100_000)),
+        history_spill_path=os.environ.get('ENERGY_HISTORY_SPILL_PATH') or None,
+        persistence_dir=os.environ.get('ENERGY_PERSISTENCE_DIR') or None,
+        checkpoint_interval=int(os.environ.get('ENERGY_CHECKPOINT_INTERVAL', 100_000)),
+        half_life=float(os.environ.get('ENERGY_HALF_LIFE', 0)) or None,
+        region_index=os.environ.get('ENERGY_REGION_INDEX', '').lower() in ('1', 'true', 'yes'),
+        field_dtype=os.environ.get('ENERGY_FIELD_DTYPE', 'complex128'),
+        idempotency_cache_size=int(os.environ.get('ENERGY_IDEMPOTENCY_CACHE_SIZE', 100_000)),
+        idempotency_ttl=float(os.environ.get('ENERGY_IDEMPOTENCY_TTL', 3600)),
+        idempotency_path=os.environ.get('ENERGY_IDEMPOTENCY_PATH') or None
+    )
+
+_energy_processor: Optional[QuantumFinancialEnergyProcessor] = None
+_energy_processor_lock = threading.Lock()
+
+def get_energy_processor() -> QuantumFinancialEnergyProcessor:
+    """Shared processor instance, created from the environment on first use"""
+    global _energy_processor
+    if _energy_processor is None:
+        with _energy_processor_lock:
+            if _energy_processor is None:
+                _energy_processor = create_processor_from_env()
+    return _energy_processor
 
-# Singleton instance for global access
-energy_processor = QuantumFinancialEnergyProcessor()
+def __getattr__(name: str):
+    # The singleton used to be built at import; `from core.energy_processor import energy_processor` still works
+    if name == 'energy_processor':
+        return get_energy_processor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
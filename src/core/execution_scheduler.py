@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class SchedulerFull(Exception):
+    """Raised when the scheduler already holds its maximum number of pending items"""
+
+
+class ResonanceScheduler:
+    """Release processed transactions at their computed resonance peaks
+
+    Pending items sit in one heap per network ordered by due time; networks
+    missing from the initial list get a heap on first use. A single
+    driver task sleeps until the earliest due item and moves everything due
+    onto a ready queue, which a fixed pool of workers drains through the
+    handler. No per-item task or timer handle is created, so hundreds of
+    thousands of pending items cost one heap entry each.
+    """
+
+    def __init__(self, handler: Callable[[Dict], Awaitable[Any]], networks: List[str],
+                 concurrency: int = 8, max_pending: int = 100_000):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self._queues: Dict[str, List[Tuple[float, int, Dict]]] = {network: [] for network in networks}
+        self._sequence = itertools.count()
+        self._live = set()
+        self._ready: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.released = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.lateness_total = 0.0
+        self.lateness_max = 0.0
+
+    async def start(self):
+        """Start the driver and worker tasks on the running loop"""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        if self._space is None:
+            self._space = asyncio.Event()
+        self._space.set()
+        self._tasks = [asyncio.create_task(self._drive())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Stop all tasks; items still pending are dropped"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def add_networks(self, networks: List[str]):
+        """Create the queues of networks not seen yet, e.g. once the processor's networks are known"""
+        for network in networks:
+            self._queues.setdefault(network, [])
+
+    def is_pending(self, ticket: int) -> bool:
+        """Whether the item is still waiting for release"""
+        return ticket in self._live
+
+    @property
+    def pending(self) -> int:
+        """Items submitted and neither released nor cancelled yet"""
+        return len(self._live)
+
+    def submit(self, result: Dict) -> int:
+        """Queue a processed transaction for release at its optimal_execution time
+
+        Returns a ticket that can be passed to cancel(). Raises SchedulerFull
+        when max_pending items are already waiting.
+        """
+        if len(self._live) >= self.max_pending:
+            raise SchedulerFull(f"{len(self._live)} transactions already pending")
+
+        due = result['optimal_execution']
+        if isinstance(due, datetime):
+            due = due.timestamp()
+        ticket = next(self._sequence)
+        queue = self._queues.setdefault(result['network'], [])
+        heapq.heappush(queue, (due, ticket, result))
+        self._live.add(ticket)
+
+        if queue[0][1] == ticket and self._wakeup is not None:
+            self._wakeup.set()
+        return ticket
+
+    async def submit_wait(self, result: Dict) -> int:
+        """Queue a processed transaction, waiting for room when the scheduler is full"""
+        while len(self._live) >= self.max_pending:
+            if self._space is None:
+                # Waiting before start(); the workers started later release items and set it
+                self._space = asyncio.Event()
+            self._space.clear()
+            await self._space.wait()
+        return self.submit(result)
+
+    def cancel(self, ticket: int) -> bool:
+        """Cancel a pending item; its heap entry is discarded lazily when it comes due"""
+        if ticket not in self._live:
+            return False
+        self._release(ticket)
+        self.cancelled += 1
+        return True
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Number of heap entries per network, including cancelled ones not yet discarded"""
+        return {network: len(queue) for network, queue in list(self._queues.items())}
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth and lateness statistics"""
+        return {
+            'pending': len(self._live),
+            'ready': self._ready.qsize() if self._ready is not None else 0,
+            'queue_depths': self.queue_depths(),
+            'released': self.released,
+            'failed': self.failed,
+            'cancelled': self.cancelled,
+            'lateness_mean': self.lateness_total / self.released if self.released else 0.0,
+            'lateness_max': self.lateness_max
+        }
+
+    async def _drive(self):
+        while True:
+            now = time.time()
+            next_due = None
+            # A copy, since networks may be added from other threads
+            for queue in list(self._queues.values()):
+                while queue and queue[0][0] <= now:
+                    due, ticket, result = heapq.heappop(queue)
+                    if ticket in self._live:
+                        self._ready.put_nowait((due, ticket, result))
+                if queue and (next_due is None or queue[0][0] < next_due):
+                    next_due = queue[0][0]
+
+            self._wakeup.clear()
+            timeout = None if next_due is None else max(0.0, next_due - time.time())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _release(self, ticket: int):
+        self._live.discard(ticket)
+        if self._space is not None:
+            self._space.set()
+
+    async def _work(self):
+        while True:
+            due, ticket, result = await self._ready.get()
+            if ticket not in self._live:
+                self._ready.task_done()
+                continue
+            self._release(ticket)
+            lateness = max(0.0, time.time() - due)
+            try:
+                await self.handler(result)
+            except Exception:
+                self.failed += 1
+            finally:
+                self.released += 1
+                self.lateness_total += lateness
+                self.lateness_max = max(self.lateness_max, lateness)
+                self._ready.task_done()
@@ -0,0 +1,269 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .energy_field import SparseEnergyField
+
+
+class _TickMessage:
+    """A delta published to every caught-up subscriber, encoded at most once"""
+
+    def __init__(self, tick: int, cells: Dict[int, complex], aggregates: Dict, decay_factor: float):
+        self.tick = tick
+        self.cells = cells
+        self.aggregates = aggregates
+        self.decay_factor = decay_factor
+        self._encoded: Optional[bytes] = None
+
+    def encode(self, broadcaster: 'FieldDeltaBroadcaster') -> bytes:
+        if self._encoded is None:
+            self._encoded = broadcaster.encode(broadcaster.delta_message(self))
+        return self._encoded
+
+
+class Subscription:
+    """One consumer's view of the delta stream
+
+    Holds at most one undelivered message. While the consumer is behind,
+    further ticks are merged into it cell by cell; once more than max_cells
+    cells are pending, the deltas are dropped and the consumer gets a full
+    snapshot of the field instead. Ticks published while a snapshot is
+    being built are held and delivered after it, less those it already
+    contains.
+    """
+
+    def __init__(self, max_cells: int):
+        self.max_cells = max_cells
+        self._event = asyncio.Event()
+        self._message: Optional[_TickMessage] = None
+        # Set once a second tick arrives before the first was delivered
+        self._merged = False
+        # A new subscriber starts from a full snapshot
+        self._resync = True
+        # Ticks offered while a snapshot is being built
+        self._held: Optional[List[_TickMessage]] = None
+        self.merged = 0
+        self.resyncs = 0
+
+    def _offer(self, message: _TickMessage, resync: bool):
+        if resync or self._resync:
+            self._resync = True
+            self._message = None
+            if self._held is not None:
+                self._held.clear()
+        elif self._held is not None:
+            # Which held ticks the snapshot contains is only known once it is built
+            self._held.append(message)
+        else:
+            self._merge(message)
+        self._event.set()
+
+    def _merge(self, message: _TickMessage):
+        if self._message is None:
+            self._message = message
+            return
+        if not self._merged:
+            # Stop sharing the undelivered tick before merging into it
+            self._message = _TickMessage(message.tick, dict(self._message.cells), message.aggregates,
+                                         message.decay_factor)
+            self._merged = True
+        cells = self._message.cells
+        for key, delta in message.cells.items():
+            cells[key] = cells.get(key, 0) + delta
+        self._message.tick = message.tick
+        self._message.aggregates = message.aggregates
+        self._message.decay_factor = message.decay_factor
+        self.merged += 1
+        if len(cells) > self.max_cells:
+            self._resync = True
+            self._message = None
+
+    async def next(self, broadcaster: 'FieldDeltaBroadcaster') -> bytes:
+        """Wait for the next message and return it encoded"""
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            if self._resync:
+                return await self._snapshot(broadcaster)
+            if self._message is not None:
+                message, self._message, self._merged = self._message, None, False
+                return message.encode(broadcaster)
+
+    async def _snapshot(self, broadcaster: 'FieldDeltaBroadcaster') -> bytes:
+        self._resync = False
+        self._message = None
+        self._held = []
+        try:
+            tick, data = await broadcaster.encoded_snapshot()
+        except BaseException:
+            # Cancelled, e.g. by a keepalive timeout; the next call starts over
+            self._resync = True
+            self._event.set()
+            raise
+        finally:
+            held, self._held = self._held, None
+        for message in held:
+            if message.tick > tick:
+                self._merge(message)
+        self.resyncs += 1
+        return data
+
+
+class FieldDeltaBroadcaster:
+    """Publish coalesced energy field changes to many subscribers
+
+    While anyone is subscribed, the broadcaster observes the processor's
+    field and sums the change of every touched cell. Each tick (interval
+    seconds) it publishes the changed cells (x, y, Δstate) and the current
+    aggregates as one message shared by all subscribers that are caught up,
+    so field updates never wait on consumers and the fan-out costs one
+    encoding per tick. Cell values are in the field's stored frame; with
+    decay enabled they are multiplied by the message's decay_factor.
+
+    Only updates made through this process are observed; with the shared
+    or sharded backends other writers show up in the aggregates and in
+    full snapshots but not as cell deltas.
+    """
+
+    def __init__(self, processor, encode: Callable[[Dict], bytes], interval: float = 0.1,
+                 max_cells: int = 10_000):
+        self.processor = processor
+        self.encode = encode
+        self.interval = interval
+        self.max_cells = max_cells
+        self.subscribers: List[Subscription] = []
+        self.tick = 0
+        self._pending: Dict[int, complex] = {}
+        self._resync = False
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._last_aggregates: Optional[Dict] = None
+
+    def subscribe(self) -> Subscription:
+        """Add a subscriber, starting the observer and publisher with the first one"""
+        subscription = Subscription(self.max_cells)
+        self.subscribers.append(subscription)
+        if self._task is None:
+            self.processor.energy_field.observers.append(self)
+            self._task = asyncio.ensure_future(self._publish_loop())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber, stopping the observer and publisher with the last one"""
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.processor.energy_field.observers.remove(self)
+            with self._lock:
+                self._pending = {}
+
+    def cells_updated(self, xs: np.ndarray, ys: np.ndarray, old: np.ndarray, new: np.ndarray):
+        keys = (np.asarray(xs, dtype=np.int64) * self.processor.grid_size + ys).tolist()
+        with self._lock:
+            pending = self._pending
+            for key, delta in zip(keys, (new - old).tolist()):
+                pending[key] = pending.get(key, 0) + delta
+            self._check_overflow()
+
+    def cell_updated(self, x: int, y: int, old: complex, new: complex):
+        key = x * self.processor.grid_size + y
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + (new - old)
+            self._check_overflow()
+
+    def scaled(self, factor: float):
+        # Every stored value changed; subscribers start again from a snapshot
+        with self._lock:
+            self._resync = True
+            self._pending = {}
+
+    def _check_overflow(self):
+        if len(self._pending) > self.max_cells:
+            self._resync = True
+            self._pending = {}
+
+    async def _publish_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.publish()
+
+    def publish(self):
+        """Send everything changed since the last tick to the subscribers"""
+        aggregates = self.processor.get_energy_snapshot()
+        decay_factor = self.processor._decay_factor()
+        with self._lock:
+            cells, self._pending = self._pending, {}
+            resync, self._resync = self._resync, False
+            if not cells and not resync and aggregates == self._last_aggregates:
+                return
+            # Taken with the pending cells, so a snapshot's tick matches the changes it rewinds
+            self.tick += 1
+            tick = self.tick
+        self._last_aggregates = aggregates
+        message = _TickMessage(tick, cells, aggregates, decay_factor)
+        for subscription in self.subscribers:
+            subscription._offer(message, resync)
+
+    def delta_message(self, message: _TickMessage) -> Dict[str, Any]:
+        size = self.processor.grid_size
+        return {
+            'type': 'delta',
+            'tick': message.tick,
+            'cells': [[key // size, key % size, delta.real, delta.imag] for key, delta in message.cells.items()],
+            'decay_factor': message.decay_factor,
+            'aggregates': message.aggregates
+        }
+
+    async def encoded_snapshot(self) -> Tuple[int, bytes]:
+        """Build and encode a snapshot on a worker thread, returning its tick and bytes
+
+        Building takes the processor lock and reads every occupied cell, so
+        it must not run on the event loop.
+        """
+        def build() -> Tuple[int, bytes]:
+            message = self.snapshot_message()
+            return message['tick'], self.encode(message)
+
+        return await asyncio.get_running_loop().run_in_executor(None, build)
+
+    def snapshot_message(self) -> Dict[str, Any]:
+        """Every occupied cell as of the last published tick"""
+        processor = self.processor
+        field = processor.energy_field
+        with processor._lock:
+            if isinstance(field, SparseEnergyField):
+                cells = field.export_cells()
+                keys, values = cells['key'].astype(np.int64), cells['value'].astype(np.complex128)
+            else:
+                grid = field.array if hasattr(field, 'array') else field.to_dense()
+                xs, ys = np.nonzero(grid)
+                keys, values = xs * field.grid_size + ys, grid[xs, ys].astype(np.complex128)
+            with self._lock:
+                pending = dict(self._pending)
+                tick = self.tick
+            aggregates = processor.get_energy_snapshot()
+
+        # Rewind changes not yet published, so the next delta applies on top of this snapshot
+        if pending:
+            pending_keys = np.fromiter(pending.keys(), dtype=np.int64, count=len(pending))
+            pending_deltas = np.fromiter(pending.values(), dtype=np.complex128, count=len(pending))
+            order = np.argsort(keys)
+            positions = np.minimum(np.searchsorted(keys, pending_keys, sorter=order), max(len(keys) - 1, 0))
+            found = (keys[order[positions]] == pending_keys) if len(keys) else np.zeros(len(pending), dtype=bool)
+            np.subtract.at(values, order[positions[found]], pending_deltas[found])
+            keys = np.concatenate([keys, pending_keys[~found]])
+            values = np.concatenate([values, -pending_deltas[~found]])
+
+        size = field.grid_size
+        return {
+            'type': 'snapshot',
+            'tick': tick,
+            'cells': [[key // size, key % size, value.real, value.imag]
+                      for key, value in zip(keys.tolist(), values.tolist()) if value],
+            'decay_factor': processor._decay_factor(),
+            'aggregates': aggregates
+        }
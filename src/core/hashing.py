@@ -0,0 +1,39 @@
+import numpy as np
+from typing import Any, Iterable
+
+# 64-bit FNV-1a parameters
+FNV_OFFSET_BASIS = 0xcbf29ce484222325
+FNV_PRIME = 0x100000001b3
+MASK_64 = 0xffffffffffffffff
+
+
+def stable_hash(value: Any) -> int:
+    """64-bit FNV-1a hash of str(value), identical in every process and on every host
+
+    Unlike the built-in hash(), the result does not depend on PYTHONHASHSEED.
+    """
+    h = FNV_OFFSET_BASIS
+    for byte in str(value).encode('utf-8'):
+        h = ((h ^ byte) * FNV_PRIME) & MASK_64
+    return h
+
+
+def stable_hash_array(values: Iterable[Any]) -> np.ndarray:
+    """Vectorized stable_hash over many values, returned as a uint64 array"""
+    encoded = [str(value).encode('utf-8') for value in values]
+    hashes = np.full(len(encoded), FNV_OFFSET_BASIS, dtype=np.uint64)
+    if not encoded:
+        return hashes
+
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    width = int(lengths.max())
+    if width == 0:
+        return hashes
+    # Zero-padded byte matrix, one row per value; columns past a value's length are skipped
+    data = np.array(encoded, dtype=f'S{width}').view(np.uint8).reshape(len(encoded), width)
+
+    prime = np.uint64(FNV_PRIME)
+    for column in range(width):
+        active = lengths > column
+        hashes = np.where(active, (hashes ^ data[:, column]) * prime, hashes)
+    return hashes
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Fields added on the way in that differ between retries of the same transaction
+VOLATILE_FIELDS = ('iso20022',)
+
+
+class IdempotencyCache:
+    """Processed results keyed by transaction id and content digest
+
+    A resubmitted transaction (same id, same content) maps to the same key,
+    so its earlier result can be returned without touching the energy field
+    again. Entries live in an in-memory LRU of at most capacity entries and
+    expire ttl seconds after they were stored. With a path, entries are also
+    written to a SQLite file that survives restarts, is shared by worker
+    processes on the host, and backs entries the LRU has evicted; claims
+    through claim_many are then atomic across those processes.
+    """
+
+    PRUNE_INTERVAL = 1000
+
+    def __init__(self, capacity: int = 100_000, ttl: float = 3600.0, path: Optional[str] = None):
+        if capacity < 1:
+            raise ValueError("Idempotency cache capacity must be at least 1")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.path = path
+        self._entries: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._stored = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires REAL, result BLOB)")
+            self._db.commit()
+
+    @staticmethod
+    def key(transaction: Dict) -> str:
+        """Transaction id plus a digest of its content"""
+        content = {name: value for name, value in transaction.items() if name not in VOLATILE_FIELDS}
+        encoded = json.dumps(content, sort_keys=True, default=str, separators=(',', ':')).encode()
+        return f"{transaction['id']}:{hashlib.blake2b(encoded, digest_size=16).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached result for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+                self.expirations += 1
+
+            if self._db is not None:
+                row = self._db.execute("SELECT expires, result FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[0] > now:
+                    result = pickle.loads(row[1])
+                    self._remember(key, row[0], result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return result
+
+            self.misses += 1
+            return None
+
+    def claim_many(self, items: Iterable[Tuple[str, Dict]]) -> List[Optional[Dict]]:
+        """Store results for keys nobody has stored yet, returning the earlier result of every other key
+
+        The returned list has None for each key claimed here. With a SQLite
+        file, each key is claimed by a single conditional insert, so of
+        several processes claiming one key at the same time exactly one
+        wins. Claims count as neither hits nor misses.
+        """
+        now = time.time()
+        expires = now + self.ttl
+        items = list(items)
+        earlier: List[Optional[Dict]] = []
+        with self._lock:
+            for key, result in items:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    earlier.append(entry[1])
+                    continue
+                if self._db is not None:
+                    # Inserts, or replaces an expired row; leaves a live row alone
+                    claimed = self._db.execute(
+                        "INSERT INTO results VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                        "expires = excluded.expires, result = excluded.result WHERE results.expires <= ?",
+                        (key, expires, pickle.dumps(result), now)
+                    ).rowcount
+                    if not claimed:
+                        row = self._db.execute("SELECT expires, result FROM results WHERE key = ?",
+                                               (key,)).fetchone()
+                        self._remember(key, row[0], pickle.loads(row[1]))
+                        earlier.append(self._entries[key][1])
+                        continue
+                self._remember(key, expires, result)
+                earlier.append(None)
+            if self._db is not None and items:
+                self._prune(len(items))
+                self._db.commit()
+        return earlier
+
+    def put(self, key: str, result: Dict):
+        """Store the result for key"""
+        self.put_many([(key, result)])
+
+    def put_many(self, items: Iterable[Tuple[str, Dict]]):
+        """Store several results at once"""
+        expires = time.time() + self.ttl
+        items = list(items)
+        with self._lock:
+            for key, result in items:
+                self._remember(key, expires, result)
+            if self._db is not None and items:
+                self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                                     [(key, expires, pickle.dumps(result)) for key, result in items])
+                self._prune(len(items))
+                self._db.commit()
+
+    def _prune(self, stored: int):
+        self._stored += stored
+        if self._stored >= self.PRUNE_INTERVAL:
+            self._db.execute("DELETE FROM results WHERE expires <= ?", (time.time(),))
+            self._stored = 0
+
+    def _remember(self, key: str, expires: float, result: Dict):
+        self._entries[key] = (expires, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate counters"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'capacity': self.capacity,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+    def close(self):
+        """Close the on-disk store"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+# Keyword -> score delta; purposes that move money out of the system score higher
+DEFAULT_INTENT_WEIGHTS: Dict[str, float] = {
+    'payment': -0.1,
+    'transfer': -0.1,
+    'donation': -0.1,
+    'investment': -0.1,
+    'exchange': -0.1,
+    'fee': 0.1,
+    'penalty': 0.1,
+    'withdrawal': 0.1,
+    'settlement': 0.1
+}
+
+
+class IntentClassifier:
+    """Score transaction purposes against weighted keywords in a single pass
+
+    The keywords are compiled once into a combined regex that finds the
+    longest keyword starting at every position of the purpose. Keywords
+    contained in a match are implied by it, so every keyword occurring
+    anywhere in the purpose is found without one scan per keyword. Scores
+    are memoized per purpose string in a bounded LRU cache.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, base: float = 0.5,
+                 minimum: float = 0.1, maximum: float = 1.0, cache_size: int = 4096):
+        weights = DEFAULT_INTENT_WEIGHTS if weights is None else weights
+        self.weights = {word.lower(): weight for word, weight in weights.items() if word}
+        self.base = base
+        self.minimum = minimum
+        self.maximum = maximum
+
+        alternatives = '|'.join(re.escape(word) for word in sorted(self.weights, key=len, reverse=True))
+        self._pattern = re.compile(f'(?=({alternatives}))') if self.weights else None
+        self._implied = {
+            word: frozenset(other for other in self.weights if other in word)
+            for word in self.weights
+        }
+        self.score = lru_cache(maxsize=cache_size)(self._score)
+
+    def _score(self, purpose: str) -> float:
+        if not purpose:
+            return self.base
+
+        matched = set()
+        if self._pattern is not None:
+            for match in self._pattern.finditer(purpose.lower()):
+                matched |= self._implied[match.group(1)]
+
+        # Accumulate in keyword order so scores match the original per-word scan
+        score = 0
+        for word, weight in self.weights.items():
+            if word in matched:
+                score += weight
+
+        return max(self.minimum, min(self.maximum, self.base + score))
+
+    def cache_info(self) -> Dict[str, int]:
+        """Hit/miss counters of the purpose cache"""
+        info = self.score.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'max_size': info.maxsize}
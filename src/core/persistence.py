@@ -0,0 +1,217 @@
+import glob
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional
+
+from .energy_field import EnergyField
+from .transaction_history import TransactionHistory
+
+WAL_DTYPE = np.dtype([
+    ('x', '<i4'),
+    ('y', '<i4'),
+    ('state', '<c16'),
+    ('energy', '<f8'),
+    ('timestamp', '<f8')
+])
+
+
+class FieldPersistence:
+    """Checkpoints and write-ahead log for an energy field
+
+    Every field update is appended to a binary write-ahead log of WAL_DTYPE
+    records. Records are buffered and written with one write and fsync per
+    group (group commit), once group_commit_size records are waiting or
+    group_commit_interval seconds after they were logged, whichever comes
+    first; a background thread commits records left waiting when updates
+    stop, until close(). A checkpoint saves the field as .npy and starts a new log segment, so
+    recovery maps the latest checkpoint and replays only the log written
+    since it. Records still buffered when the process dies are lost.
+
+    Files in the directory, for checkpoint sequence number N:
+    checkpoint-N.npy (field cells), checkpoint-N.history.npy (retained
+    history), checkpoint-N.json (aggregates) and wal-N.log (updates since).
+    """
+
+    def __init__(self, directory: str, group_commit_size: int = 1024, group_commit_interval: float = 0.05,
+                 fsync: bool = True):
+        self.directory = directory
+        self.group_commit_size = group_commit_size
+        self.group_commit_interval = group_commit_interval
+        self.fsync = fsync
+        self.sequence = 0
+        self.logged_since_checkpoint = 0
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._last_commit = time.monotonic()
+        self._wal = None
+        # Guards the buffer and log file against the commit thread
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._committer: Optional[threading.Thread] = None
+        # Caller-supplied metadata of the checkpoint last written or recovered
+        self.metadata: Dict = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str, sequence: int) -> str:
+        return os.path.join(self.directory, name.format(sequence=sequence))
+
+    def _sequences(self, name: str) -> List[int]:
+        prefix, suffix = name.split('{sequence:08d}')
+        regex = re.compile(re.escape(prefix) + r'(\d{8})' + re.escape(suffix) + '$')
+        found = []
+        for path in glob.glob(os.path.join(self.directory, prefix + '*' + suffix)):
+            match = regex.match(os.path.basename(path))
+            if match:
+                found.append(int(match.group(1)))
+        return sorted(found)
+
+    def log(self, x: int, y: int, state: complex, energy: float, timestamp: float):
+        """Log a single field update"""
+        self.log_batch(np.array([(x, y, state, energy, timestamp)], dtype=WAL_DTYPE))
+
+    def log_batch(self, records: np.ndarray):
+        """Log a batch of field updates given as a WAL_DTYPE array"""
+        with self._lock:
+            self._buffer.append(records)
+            self._buffered += len(records)
+            self.logged_since_checkpoint += len(records)
+            if (self._buffered >= self.group_commit_size
+                    or time.monotonic() - self._last_commit >= self.group_commit_interval):
+                self._commit()
+            elif self._committer is None and not self._closed.is_set():
+                self._committer = threading.Thread(target=self._commit_periodically, daemon=True)
+                self._committer.start()
+
+    def _commit_periodically(self):
+        # Anything buffered when the thread wakes was logged less than one interval ago
+        while not self._closed.wait(self.group_commit_interval):
+            with self._lock:
+                self._commit()
+
+    def commit(self):
+        """Write buffered records to the log and make them durable"""
+        with self._lock:
+            self._commit()
+
+    def _commit(self):
+        self._last_commit = time.monotonic()
+        if not self._buffer:
+            return
+        if self._wal is None:
+            self._wal = open(self._path('wal-{sequence:08d}.log', self.sequence), 'ab')
+        self._wal.write(b''.join(records.tobytes() for records in self._buffer))
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+        self._buffer = []
+        self._buffered = 0
+
+    def checkpoint(self, field: EnergyField, history: Optional[TransactionHistory] = None,
+                   metadata: Optional[Dict] = None):
+        """Save the field and start a new log segment, dropping older files"""
+        with self._lock:
+            self._checkpoint(field, history, metadata)
+
+    def _checkpoint(self, field: EnergyField, history: Optional[TransactionHistory], metadata: Optional[Dict]):
+        self._commit()
+        sequence = self.sequence + 1
+
+        self._save_atomic(self._path('checkpoint-{sequence:08d}.npy', sequence), field.export_cells())
+        if history is not None:
+            self._save_atomic(self._path('checkpoint-{sequence:08d}.history.npy', sequence), history.records())
+        meta = {'grid_size': field.grid_size, 'backend': type(field).__name__,
+                'aggregates': field.aggregate_totals().tolist(), 'created_at': time.time(),
+                'metadata': metadata or {}}
+        meta_path = self._path('checkpoint-{sequence:08d}.json', sequence)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        self.sequence = sequence
+        self.logged_since_checkpoint = 0
+        self.metadata = metadata or {}
+
+        for old in self._sequences('checkpoint-{sequence:08d}.json') + self._sequences('wal-{sequence:08d}.log'):
+            if old < sequence:
+                for name in ('checkpoint-{sequence:08d}.npy', 'checkpoint-{sequence:08d}.history.npy',
+                             'checkpoint-{sequence:08d}.json', 'wal-{sequence:08d}.log'):
+                    path = self._path(name, old)
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def _save_atomic(self, path: str, array: np.ndarray):
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, array)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+
+    def recover(self, field: EnergyField, history: Optional[TransactionHistory] = None,
+                chunk_size: int = 65536) -> int:
+        """Load the latest checkpoint into a fresh field and replay the log written since
+
+        Returns the number of log records replayed.
+        """
+        checkpoints = self._sequences('checkpoint-{sequence:08d}.json')
+        if checkpoints:
+            self.sequence = checkpoints[-1]
+            with open(self._path('checkpoint-{sequence:08d}.json', self.sequence)) as f:
+                meta = json.load(f)
+            if meta['grid_size'] != field.grid_size:
+                raise ValueError(f"Checkpoint grid size {meta['grid_size']} does not match field {field.grid_size}")
+            field.import_cells(np.load(self._path('checkpoint-{sequence:08d}.npy', self.sequence), mmap_mode='c'))
+            field.restore_aggregate_totals(np.array(meta['aggregates']))
+            self.metadata = meta.get('metadata', {})
+
+            history_path = self._path('checkpoint-{sequence:08d}.history.npy', self.sequence)
+            if history is not None and os.path.exists(history_path):
+                history.extend(np.load(history_path).astype(history.dtype))
+
+        replayed = 0
+        for sequence in self._sequences('wal-{sequence:08d}.log'):
+            if sequence < self.sequence:
+                continue
+            path = self._path('wal-{sequence:08d}.log', sequence)
+            # Drop a torn record at the tail so later appends stay aligned
+            count = os.path.getsize(path) // WAL_DTYPE.itemsize
+            if os.path.getsize(path) != count * WAL_DTYPE.itemsize:
+                os.truncate(path, count * WAL_DTYPE.itemsize)
+            if not count:
+                continue
+            records = np.memmap(path, dtype=WAL_DTYPE, mode='r', shape=(count,))
+            for start in range(0, count, chunk_size):
+                chunk = records[start:start + chunk_size]
+                field.add(chunk['x'], chunk['y'], chunk['state'].astype(field.dtype))
+                if history is not None:
+                    history.extend(_history_records(chunk, history.dtype))
+            replayed += count
+            self.sequence = sequence
+
+        return replayed
+
+    def close(self):
+        """Stop the commit thread, commit buffered records and close the log"""
+        self._closed.set()
+        if self._committer is not None:
+            self._committer.join()
+            self._committer = None
+        with self._lock:
+            self._commit()
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+
+
+def _history_records(chunk: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    records = np.zeros(len(chunk), dtype=dtype)
+    for name in ('energy', 'x', 'y', 'timestamp'):
+        records[name] = chunk[name]
+    return records
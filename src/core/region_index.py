@@ -0,0 +1,154 @@
+import numpy as np
+from typing import Dict, Tuple
+
+from .energy_field import EnergyField
+
+
+class FenwickTree2D:
+    """2D binary indexed tree over an n x n grid of values
+
+    Point updates and prefix-rectangle sums both touch O(log² n) nodes.
+    Nodes are kept in a dense (n+1) x (n+1) array, or in a dict of the nodes
+    actually touched when sparse is set, so memory follows the occupied
+    cells instead of the grid size.
+    """
+
+    def __init__(self, size: int, dtype=float, sparse: bool = False):
+        self.size = size
+        self.dtype = np.dtype(dtype)
+        self.sparse = sparse
+        if sparse:
+            self._nodes: Dict[int, complex] = {}
+        else:
+            self._tree = np.zeros((size + 1, size + 1), dtype=self.dtype)
+
+    def add(self, xs: np.ndarray, ys: np.ndarray, deltas: np.ndarray):
+        """Add deltas at cells (xs, ys)"""
+        if self.sparse:
+            for x, y, delta in zip(np.asarray(xs).tolist(), np.asarray(ys).tolist(), np.asarray(deltas).tolist()):
+                self.add_one(x, y, delta)
+            return
+
+        i = np.asarray(xs, dtype=np.int64) + 1
+        ys = np.asarray(ys, dtype=np.int64) + 1
+        deltas = np.asarray(deltas, dtype=self.dtype)
+        # Walk all updates up the tree together, one level of x and y at a time
+        while i.size:
+            j, row, values = ys, i, deltas
+            while j.size:
+                np.add.at(self._tree, (row, j), values)
+                j = j + (j & -j)
+                keep = j <= self.size
+                j, row, values = j[keep], row[keep], values[keep]
+            i = i + (i & -i)
+            keep = i <= self.size
+            i, ys, deltas = i[keep], ys[keep], deltas[keep]
+
+    def add_one(self, x: int, y: int, delta):
+        """Add delta at one cell"""
+        n = self.size
+        i = x + 1
+        while i <= n:
+            j = y + 1
+            while j <= n:
+                if self.sparse:
+                    key = i * (n + 1) + j
+                    self._nodes[key] = self._nodes.get(key, 0) + delta
+                else:
+                    self._tree[i, j] += delta
+                j += j & -j
+            i += i & -i
+
+    def prefix_sum(self, x: int, y: int):
+        """Sum over cells [0, x) x [0, y)"""
+        n = self.size
+        total = 0
+        i = x
+        while i > 0:
+            j = y
+            while j > 0:
+                if self.sparse:
+                    total += self._nodes.get(i * (n + 1) + j, 0)
+                else:
+                    total += self._tree[i, j]
+                j -= j & -j
+            i -= i & -i
+        return total
+
+    def range_sum(self, x_min: int, x_max: int, y_min: int, y_max: int):
+        """Sum over the inclusive rectangle [x_min, x_max] x [y_min, y_max]"""
+        return (self.prefix_sum(x_max + 1, y_max + 1) - self.prefix_sum(x_min, y_max + 1)
+                - self.prefix_sum(x_max + 1, y_min) + self.prefix_sum(x_min, y_min))
+
+    def scale(self, factor: float):
+        """Multiply every cell by factor"""
+        if self.sparse:
+            self._nodes = {key: value * factor for key, value in self._nodes.items()}
+        else:
+            self._tree *= factor
+
+    def build(self, grid: np.ndarray):
+        """Load a dense grid of cell values in O(n²), replacing the current contents"""
+        n = self.size
+        prefix = np.zeros((n + 1, n + 1), dtype=self.dtype)
+        prefix[1:, 1:] = np.cumsum(np.cumsum(grid, axis=0), axis=1)
+        index = np.arange(n + 1)
+        low = index - (index & -index)
+        # Node (i, j) covers rows (i - lowbit(i), i] and columns (j - lowbit(j), j]
+        tree = (prefix - prefix[low, :] - prefix[:, low] + prefix[np.ix_(low, low)])
+        tree[0, :] = 0
+        tree[:, 0] = 0
+        if self.sparse:
+            rows, columns = np.nonzero(tree)
+            self._nodes = dict(zip((rows * (n + 1) + columns).tolist(), tree[rows, columns].tolist()))
+        else:
+            self._tree = tree
+
+
+class RegionIndex:
+    """Rectangle queries over an energy field
+
+    Observes a field's cell updates and keeps two Fenwick trees: one of cell
+    magnitudes |z| (energy) and one of the complex cell states, whose sum
+    gives the net state of a region. Queries cost O(log² n) instead of a
+    scan of the rectangle.
+    """
+
+    def __init__(self, grid_size: int, sparse: bool = False):
+        self.grid_size = grid_size
+        self.magnitudes = FenwickTree2D(grid_size, float, sparse)
+        self.states = FenwickTree2D(grid_size, complex, sparse)
+
+    @classmethod
+    def for_field(cls, field: EnergyField) -> 'RegionIndex':
+        """Build an index over the field's current cells and subscribe it to further updates"""
+        index = cls(field.grid_size, sparse=not hasattr(field, 'array'))
+        if hasattr(field, 'array'):
+            grid = np.asarray(field.values())
+            index.magnitudes.build(np.abs(grid))
+            index.states.build(grid)
+        else:
+            cells = field.export_cells()
+            xs, ys = cells['key'] // field.grid_size, cells['key'] % field.grid_size
+            index.cells_updated(xs, ys, np.zeros(len(cells), dtype=field.dtype), cells['value'])
+        field.observers.append(index)
+        return index
+
+    def cells_updated(self, xs: np.ndarray, ys: np.ndarray, old: np.ndarray, new: np.ndarray):
+        self.magnitudes.add(xs, ys, np.abs(new) - np.abs(old))
+        self.states.add(xs, ys, new - old)
+
+    def cell_updated(self, x: int, y: int, old: complex, new: complex):
+        self.magnitudes.add_one(x, y, abs(new) - abs(old))
+        self.states.add_one(x, y, new - old)
+
+    def scaled(self, factor: float):
+        self.magnitudes.scale(factor)
+        self.states.scale(factor)
+
+    def query(self, x_min: int, x_max: int, y_min: int, y_max: int) -> Tuple[float, complex]:
+        """Energy (sum of magnitudes) and net state over an inclusive rectangle"""
+        if not (0 <= x_min <= x_max < self.grid_size and 0 <= y_min <= y_max < self.grid_size):
+            raise ValueError(f"Region must satisfy 0 <= min <= max < {self.grid_size} on both axes")
+        return (float(self.magnitudes.range_sum(x_min, x_max, y_min, y_max)),
+                complex(self.states.range_sum(x_min, x_max, y_min, y_max)))
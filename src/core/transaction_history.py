@@ -0,0 +1,107 @@
+import os
+import numpy as np
+from typing import Optional
+
+
+def history_dtype(energy_dtype='f8') -> np.dtype:
+    """Record layout of the history for a given energy precision"""
+    return np.dtype([
+        ('energy', energy_dtype),
+        ('x', 'i4'),
+        ('y', 'i4'),
+        ('timestamp', 'f8'),
+        ('transaction_id', 'S64')
+    ])
+
+
+HISTORY_DTYPE = history_dtype()
+
+
+class TransactionHistory:
+    """Fixed-capacity ring buffer of processed transaction records
+
+    Records are kept in a structured NumPy array holding the energy, field
+    coordinates, timestamp and transaction id of each update. Once the buffer
+    is full the oldest records roll off; with a spill_path they are appended
+    to a raw file of records that read_spilled() maps back in. Energies are
+    stored as energy_dtype (float64 by default, float32 to halve them).
+    """
+
+    def __init__(self, capacity: int = 100_000, spill_path: Optional[str] = None, energy_dtype='f8'):
+        if capacity < 1:
+            raise ValueError("History capacity must be at least 1")
+        self.capacity = capacity
+        self.dtype = history_dtype(energy_dtype)
+        self.spill_path = spill_path
+        self.total = 0
+        self.spilled = 0
+        self._records = np.zeros(capacity, dtype=self.dtype)
+        self._start = 0
+        self._length = 0
+        self._spill_file = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, energy: float, x: int, y: int, timestamp: float, transaction_id: str = ''):
+        """Record a single transaction"""
+        if self._length == self.capacity:
+            self._spill(self._records[self._start:self._start + 1])
+            self._start = (self._start + 1) % self.capacity
+            self._length -= 1
+
+        index = (self._start + self._length) % self.capacity
+        self._records[index] = (energy, x, y, timestamp, str(transaction_id).encode())
+        self._length += 1
+        self.total += 1
+
+    def extend(self, records: np.ndarray):
+        """Record a batch of transactions given as an array of self.dtype records"""
+        count = len(records)
+        overflow = self._length + count - self.capacity
+        if overflow > 0:
+            rolled = min(overflow, self._length)
+            self._spill(self._take(0, rolled))
+            self._start = (self._start + rolled) % self.capacity
+            self._length -= rolled
+            # A batch larger than the whole buffer rolls off part of itself
+            if overflow > rolled:
+                self._spill(records[:overflow - rolled])
+                records = records[overflow - rolled:]
+
+        end = (self._start + self._length) % self.capacity
+        head = min(len(records), self.capacity - end)
+        self._records[end:end + head] = records[:head]
+        self._records[:len(records) - head] = records[head:]
+        self._length += len(records)
+        self.total += count
+
+    def records(self) -> np.ndarray:
+        """Retained records in chronological order"""
+        return self._take(0, self._length)
+
+    def read_spilled(self) -> np.ndarray:
+        """Memory-map the records that have rolled off to the spill file"""
+        if self._spill_file is not None:
+            self._spill_file.flush()
+        if not self.spill_path or not os.path.exists(self.spill_path) or os.path.getsize(self.spill_path) == 0:
+            return np.zeros(0, dtype=self.dtype)
+        return np.memmap(self.spill_path, dtype=self.dtype, mode='r')
+
+    def close(self):
+        """Flush and close the spill file"""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+
+    def _take(self, offset: int, count: int) -> np.ndarray:
+        indices = (self._start + offset + np.arange(count)) % self.capacity
+        return self._records[indices]
+
+    def _spill(self, records: np.ndarray):
+        if not len(records) or not self.spill_path:
+            return
+        if self._spill_file is None:
+            self._spill_file = open(self.spill_path, 'ab')
+        self._spill_file.write(records.tobytes())
+        self.spilled += len(records)
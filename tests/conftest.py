@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The server imports core and compliance from src, so the tests do the same
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
@@ -0,0 +1,30 @@
+import asyncio
+
+from core.batch_coalescer import BatchCoalescer
+
+
+def test_failed_batch_is_bisected_to_the_bad_request():
+    batches = []
+
+    async def handler(batch, network):
+        batches.append(len(batch))
+        if any(transaction['amount'] == 'bad' for transaction in batch):
+            raise ValueError("bad amount")
+        return [{'amount': transaction['amount'], 'network': network} for transaction in batch]
+
+    async def run():
+        coalescer = BatchCoalescer(handler, window=0.01)
+        requests = [[{'amount': i * 10 + j} for j in range(3)] for i in range(4)]
+        requests[2][1]['amount'] = 'bad'
+        results = await asyncio.gather(*(coalescer.submit(request, 'XRP') for request in requests),
+                                       return_exceptions=True)
+        return requests, results, coalescer.metrics()
+
+    requests, results, metrics = asyncio.run(run())
+
+    assert isinstance(results[2], ValueError)
+    for index in (0, 1, 3):
+        assert [result['amount'] for result in results[index]] == [t['amount'] for t in requests[index]]
+    # One merged batch, then halves of two requests, then the failing half split into single requests
+    assert batches == [12, 6, 6, 3, 3]
+    assert metrics['batches'] == 1 and metrics['retried_requests'] == 4 + 2
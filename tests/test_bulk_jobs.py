@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from core.bulk_jobs import BulkJobRunner, JobStore
+from core.energy_processor import QuantumFinancialEnergyProcessor
+
+
+def encode(record):
+    return (json.dumps(record, default=str) + '\n').encode()
+
+def make_runner(directory, handler=None):
+    processor = QuantumFinancialEnergyProcessor()
+
+    async def process(transactions, network):
+        return [encode(result) for result in processor.process_batch(transactions, network)]
+
+    return BulkJobRunner(JobStore(str(directory), fsync=False), handler or process, encode,
+                         validate=QuantumFinancialEnergyProcessor.check_transaction)
+
+async def upload(lines):
+    yield ('\n'.join(lines) + '\n').encode()
+
+async def wait(job):
+    while job.status in ('queued', 'running'):
+        await asyncio.sleep(0.001)
+    return job
+
+def test_invalid_transactions_get_error_records(tmp_path):
+    lines = [json.dumps({'id': f't{i}', 'amount': i}) for i in range(10)]
+    lines[3] = json.dumps({'id': 't3', 'amount': 'ten'})
+    lines[6] = json.dumps({'id': 't6', 'amount': -5})
+    lines[8] = '[1, 2]'
+
+    async def run():
+        runner = make_runner(tmp_path)
+        job = await wait(await runner.submit('XRP', upload(lines), chunk_size=4))
+        return job, [json.loads(record) for record in runner.results(job.id, 0, 100)]
+
+    job, results = asyncio.run(run())
+
+    assert job.status == 'completed'
+    assert (job.processed, job.errors, job.result_count) == (7, 3, 10)
+    assert [result.get('line') for result in results if 'error' in result] == [4, 7, 9]
+    assert all('energy_signature' in result for index, result in enumerate(results) if index not in (3, 6, 8))
+
+def test_resume_discards_interrupted_chunk_and_finishes(tmp_path):
+    lines = [json.dumps({'id': f't{i}', 'amount': i + 1}) for i in range(10)]
+    processor = QuantumFinancialEnergyProcessor()
+    calls = []
+
+    async def flaky(transactions, network):
+        calls.append(len(transactions))
+        if len(calls) == 2:
+            # Leave a partial chunk past the checkpoint, as a crash mid-write would
+            for name, data in (('results.ndjson', b'{"partial": true}\n'), ('results.idx', bytes(8))):
+                with open(tmp_path / job_id / name, 'ab') as f:
+                    f.write(data)
+            raise RuntimeError("worker lost")
+        return [encode(result) for result in processor.process_batch(transactions, network)]
+
+    async def run():
+        nonlocal runner, job_id
+        runner = make_runner(tmp_path, flaky)
+        job = await runner.submit('XRP', upload(lines), chunk_size=4)
+        job_id = job.id
+        await wait(job)
+        failed = (job.status, job.result_count, job.lines_read)
+        # A new runner over the same store, as after a restart
+        runner = make_runner(tmp_path, flaky)
+        job = await wait(runner.resume(job_id))
+        return failed, job, [json.loads(record) for record in runner.results(job_id, 0, 100)]
+
+    runner = job_id = None
+    failed, job, results = asyncio.run(run())
+
+    assert failed == ('failed', 4, 4)
+    assert job.status == 'completed'
+    assert (job.processed, job.result_count, job.lines_read) == (10, 10, 10)
+    assert calls == [4, 4, 4, 2]
+    assert not any('partial' in result for result in results)
+    assert processor.get_energy_snapshot()['transaction_count'] == 10
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import random
+import time
+
+import numpy as np
+import pytest
+
+from core.energy_processor import QuantumFinancialEnergyProcessor
+from core.persistence import WAL_DTYPE
+
+PURPOSES = ['payment', 'fee', 'transfer for settlement', '', 'donation investment', 'penalty', 'xyz']
+
+@pytest.fixture
+def transactions():
+    rng = random.Random(1)
+    # Repeated ids exercise the idempotency cache on both paths
+    return [
+        {
+            'id': f't{i % 700}',
+            'amount': rng.random() * 10 ** rng.randint(0, 7),
+            'purpose': rng.choice(PURPOSES),
+            **({'time_priority': rng.random()} if i % 3 else {})
+        }
+        for i in range(3000)
+    ]
+
+def process_scalar(processor, transactions, network):
+    async def run():
+        return [await processor.process_transaction(transaction, network) for transaction in transactions]
+    return asyncio.run(run())
+
+def test_batch_matches_scalar_bit_exact(transactions):
+    scalar = QuantumFinancialEnergyProcessor()
+    batch = QuantumFinancialEnergyProcessor()
+
+    scalar_results = process_scalar(scalar, transactions, 'XRP')
+    batch_results = batch.process_batch(transactions, 'XRP')
+
+    assert len(batch_results) == len(scalar_results)
+    for expected, actual in zip(scalar_results, batch_results):
+        assert actual['energy_signature'] == expected['energy_signature']
+        assert actual['quantum_state'] == expected['quantum_state']
+    assert np.array_equal(scalar.energy_field.to_dense(), batch.energy_field.to_dense())
+    # Running aggregates are summed per batch rather than per transaction
+    assert batch.get_energy_snapshot() == pytest.approx(scalar.get_energy_snapshot(), rel=1e-12)
+
+def test_sparse_field_matches_dense(transactions):
+    dense = QuantumFinancialEnergyProcessor()
+    sparse = QuantumFinancialEnergyProcessor(field_backend='sparse')
+
+    for processor in (dense, sparse):
+        processor.process_batch(transactions[:2000], 'XRP')
+        process_scalar(processor, transactions[2000:2500], 'XLM')
+        processor.process_batch(transactions[2500:], 'HBAR')
+
+    assert sparse.get_energy_snapshot() == dense.get_energy_snapshot()
+    assert np.array_equal(sparse.energy_field.to_dense(), dense.energy_field.to_dense())
+    assert sparse.energy_field.occupied < sparse.energy_field.size
+
+@pytest.mark.parametrize('field_backend', ['dense', 'sparse'])
+def test_restart_recovers_checkpoint_and_log_tail(tmp_path, field_backend):
+    transactions = [{'id': f't{i}', 'amount': i * 1.1} for i in range(5000)]
+    processor = QuantumFinancialEnergyProcessor(
+        field_backend=field_backend, persistence_dir=str(tmp_path), checkpoint_interval=3000
+    )
+    for start in range(0, 4500, 500):
+        processor.process_batch(transactions[start:start + 500], 'XRP')
+    # Scalar updates after the last checkpoint are only in the log tail
+    process_scalar(processor, transactions[4500:4600], 'XLM')
+    snapshot = processor.get_energy_snapshot()
+    field = processor.energy_field.to_dense()
+    history = processor.transaction_history.records()
+    processor.close()
+    assert list(tmp_path.glob('checkpoint-*.npy'))
+
+    recovered = QuantumFinancialEnergyProcessor(field_backend=field_backend, persistence_dir=str(tmp_path))
+
+    # Aggregates are rebuilt from the restored cells, so they may differ in the last bit
+    assert recovered.get_energy_snapshot() == pytest.approx(snapshot, rel=1e-12)
+    assert np.array_equal(recovered.energy_field.to_dense(), field)
+    columns = ['energy', 'x', 'y', 'timestamp']
+    assert np.array_equal(recovered.transaction_history.records()[columns], history[columns])
+    recovered.close()
+
+def test_idle_log_is_committed_within_the_group_commit_interval(tmp_path):
+    processor = QuantumFinancialEnergyProcessor(persistence_dir=str(tmp_path))
+    processor.process_batch([{'id': f't{i}', 'amount': i} for i in range(100)], 'XRP')
+    processor.process_batch([{'id': f'u{i}', 'amount': i} for i in range(100)], 'XRP')
+    time.sleep(processor.persistence.group_commit_interval * 6)
+
+    assert os.path.getsize(tmp_path / 'wal-00000000.log') == 200 * WAL_DTYPE.itemsize
+    processor.close()
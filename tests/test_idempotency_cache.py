@@ -0,0 +1,27 @@
+from core.idempotency_cache import IdempotencyCache
+
+
+def test_claims_are_shared_through_the_sqlite_file(tmp_path):
+    path = str(tmp_path / 'idempotency.db')
+    # Two caches on one file stand in for two worker processes
+    first = IdempotencyCache(path=path)
+    second = IdempotencyCache(path=path)
+
+    assert first.claim_many([('a', {'worker': 1}), ('b', {'worker': 1})]) == [None, None]
+    assert second.claim_many([('b', {'worker': 2}), ('c', {'worker': 2})]) == [{'worker': 1}, None]
+    assert first.claim_many([('c', {'worker': 1})]) == [{'worker': 2}]
+    assert second.get('a') == {'worker': 1}
+    first.close()
+    second.close()
+
+def test_expired_entries_can_be_claimed_again(tmp_path):
+    path = str(tmp_path / 'idempotency.db')
+    first = IdempotencyCache(ttl=-1, path=path)
+    second = IdempotencyCache(path=path)
+
+    assert first.claim_many([('a', {'worker': 1})]) == [None]
+    assert second.claim_many([('a', {'worker': 2})]) == [None]
+    reader = IdempotencyCache(path=path)
+    assert reader.get('a') == {'worker': 2}
+    for cache in (first, second, reader):
+        cache.close()
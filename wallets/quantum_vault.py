@@ -1,8 +1,14 @@
 import hmac
 import hashlib
 import secrets
-from typing import Dict, List
-import numpy as np
+import threading
+from typing import Dict, List, Optional
+
+try:
+    from core.metrics import metrics
+except ImportError:
+    # Instrumentation is only available with src on the import path
+    metrics = None
 
 class QuantumVault:
     """Quantum-resistant multi-chain wallet"""
@@ -31,6 +37,12 @@ class QuantumVault:
     
     def sign_transaction(self, transaction: Dict, network: str) -> Dict:
         """Sign transaction with quantum-resistant signature"""
+        if metrics is None:
+            return self._sign_transaction(transaction, network)
+        with metrics.stage('vault_sign', network):
+            return self._sign_transaction(transaction, network)
+    
+    def _sign_transaction(self, transaction: Dict, network: str) -> Dict:
         transaction_data = self._serialize_transaction(transaction)
         signature = self._quantum_sign(transaction_data, network)
         
@@ -76,5 +88,20 @@ class QuantumVault:
         except:
             return False
 
-# Global wallet instance
-quantum_vault = QuantumVault()
+_quantum_vault: Optional[QuantumVault] = None
+_quantum_vault_lock = threading.Lock()
+
+def get_quantum_vault() -> QuantumVault:
+    """Global wallet instance, seeded and keyed on first use"""
+    global _quantum_vault
+    if _quantum_vault is None:
+        with _quantum_vault_lock:
+            if _quantum_vault is None:
+                _quantum_vault = QuantumVault()
+    return _quantum_vault
+
+def __getattr__(name: str):
+    # Keeps `from wallets.quantum_vault import quantum_vault` working without a seed at import
+    if name == 'quantum_vault':
+        return get_quantum_vault()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")